@@ -0,0 +1,110 @@
+# Módulo: inventario de activos por proyecto, actualizado por lotes durante la ingesta
+from datetime import datetime
+from sqlalchemy import case, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+import redis as redislib
+from .config import settings
+from .diff import IGNORED_CATEGORIES, normalize_value
+from .models import Asset, Scan
+
+_UPSERT = {"postgresql": pg_insert, "sqlite": sqlite_insert}
+
+r = redislib.from_url(settings.REDIS_URL, decode_responses=True)
+
+# Activos ya contados por scan: SADD devuelve 1 solo la primera vez que un scan ve un activo, aunque lo
+# reporten varias herramientas o carriles y aunque sus lotes se intercalen con los de otro scan del proyecto
+_first_sightings = r.register_script("""
+local new = {}
+for _, member in ipairs(ARGV) do
+  if redis.call('SADD', KEYS[1], member) == 1 then new[#new + 1] = member end
+end
+redis.call('EXPIRE', KEYS[1], 172800)
+return new
+""")
+
+def _seen_key(scan_id: int) -> str:
+    return f"scan:{scan_id}:assets"
+
+def _member(key: tuple[str, str]) -> str:
+    return f"{key[0]}\t{key[1]}"
+
+def _upsert(db: Session, insert_fn, rows: list[dict], exact: bool) -> None:
+    stmt = insert_fn(Asset).values(rows)
+    ex = stmt.excluded
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["project_id", "category", "value"],
+        set_={
+            "last_seen": ex.last_seen,
+            "last_scan_id": ex.last_scan_id,
+            # Con Redis el lote trae el incremento exacto (1 solo en el primer avistamiento del scan);
+            # sin Redis, aproximación por last_scan_id
+            "scan_count": Asset.scan_count + (ex.scan_count if exact else
+                                              case((Asset.last_scan_id == ex.last_scan_id, 0), else_=1)),
+            "seen_by_tools": case(
+                (Asset.seen_by_tools.contains(ex.seen_by_tools), Asset.seen_by_tools),
+                else_=Asset.seen_by_tools + func.substr(ex.seen_by_tools, 2),
+            ),
+        },
+    )
+    db.execute(stmt)
+
+def upsert_assets(db: Session, scan: Scan, items: list[dict]) -> None:
+    """INSERT ... ON CONFLICT DO UPDATE de un lote: un statement por flush de la ingesta (uno más por
+    cada herramienta adicional cuando un mismo ingestor trae varias, p.ej. los carriles masivos)."""
+    insert_fn = _UPSERT.get(db.get_bind().dialect.name)
+    if insert_fn is None or scan.project_id is None:
+        return
+    now = datetime.utcnow()
+    rows: dict[tuple[str, str], dict] = {}
+    tools: dict[tuple[str, str], list[str]] = {}
+    for item in items:
+        category = item.get("category", "info")
+        if category in IGNORED_CATEGORIES:
+            continue
+        value = normalize_value(item.get("value", ""))[:500]
+        if not value:
+            continue
+        key, tool = (category, value), item.get("tool", "unknown")
+        if key in rows:
+            if tool not in tools[key]:
+                tools[key].append(tool)
+            continue
+        tools[key] = [tool]
+        rows[key] = {
+            "project_id": scan.project_id,
+            "category": category,
+            "value": value,
+            "first_seen": now,
+            "last_seen": now,
+            "seen_by_tools": f",{tool},",
+            "scan_count": 1,
+            "last_scan_id": scan.id,
+        }
+    if not rows:
+        return
+    try:
+        first = set(_first_sightings(keys=[_seen_key(scan.id)], args=[_member(k) for k in rows]))
+    except Exception:
+        first = None
+    try:
+        # Una fila no puede actualizarse dos veces en el mismo statement: cada herramienta extra de un
+        # activo va en una pasada posterior, que la une a seen_by_tools sin volver a contar el scan
+        for i in range(max(len(t) for t in tools.values())):
+            batch = []
+            for key, row in rows.items():
+                if len(tools[key]) <= i:
+                    continue
+                count = 0 if i else (1 if first is None or _member(key) in first else 0)
+                batch.append(dict(row, seen_by_tools=f",{tools[key][i]},", scan_count=count))
+            _upsert(db, insert_fn, batch, exact=first is not None)
+        db.commit()
+    except Exception:
+        # El lote no se aplicó: sus activos deben volver a contar en el siguiente intento
+        if first:
+            try:
+                r.srem(_seen_key(scan.id), *first)
+            except Exception:
+                pass
+        raise
@@ -0,0 +1,74 @@
+# Módulo: caché de resultados por (herramienta, objetivo, opciones)
+import hashlib
+import json
+import time
+import zlib
+import redis as redislib
+from .config import settings
+from .diff import normalize_value
+
+# Cliente binario: los resultados se guardan comprimidos
+r = redislib.from_url(settings.REDIS_URL)
+
+INDEX_KEY = "toolcache:index"  # ZSET clave -> último uso, para expulsar las menos usadas
+STATS_KEY = "toolcache:stats"  # HASH "<tool>:hits" / "<tool>:misses"
+
+class ToolResultCache:
+    """Caché opt-in de la salida de herramientas pasivas, con TTL y tamaño máximo (LRU)."""
+
+    def enabled_for(self, tool) -> bool:
+        return settings.TOOL_CACHE_ENABLED and getattr(tool, "cacheable", False)
+
+    def key(self, tool, target: str) -> str:
+        payload = json.dumps({"target": normalize_value(target), "options": getattr(tool, "options", {})}, sort_keys=True)
+        return f"toolcache:{tool.id}:{hashlib.sha1(payload.encode('utf-8')).hexdigest()}"
+
+    def get(self, tool, target: str) -> list[dict] | None:
+        key = self.key(tool, target)
+        try:
+            data = r.get(key)
+            pipe = r.pipeline(transaction=False)
+            pipe.hincrby(STATS_KEY, f"{tool.id}:{'hits' if data is not None else 'misses'}", 1)
+            if data is not None:
+                pipe.zadd(INDEX_KEY, {key: time.time()})
+            pipe.execute()
+        except Exception:
+            return None
+        if data is None:
+            return None
+        return json.loads(zlib.decompress(data))
+
+    def put(self, tool, target: str, findings: list[dict]) -> None:
+        if len(findings) > settings.TOOL_CACHE_MAX_ITEMS:
+            return
+        key = self.key(tool, target)
+        now = time.time()
+        data = zlib.compress(json.dumps(findings, default=str).encode("utf-8"))
+        try:
+            pipe = r.pipeline(transaction=False)
+            pipe.set(key, data, ex=settings.TOOL_CACHE_TTL)
+            pipe.zadd(INDEX_KEY, {key: now})
+            pipe.zremrangebyscore(INDEX_KEY, "-inf", now - settings.TOOL_CACHE_TTL)
+            pipe.zcard(INDEX_KEY)
+            size = pipe.execute()[-1]
+            excess = size - settings.TOOL_CACHE_MAX_ENTRIES
+            if excess > 0:
+                evicted = [k for k, _ in r.zpopmin(INDEX_KEY, excess)]
+                if evicted:
+                    r.delete(*evicted)
+        except Exception:
+            pass
+
+    def stats(self) -> dict:
+        out: dict = {}
+        try:
+            raw = r.hgetall(STATS_KEY)
+            entries = r.zcard(INDEX_KEY)
+        except Exception:
+            return {"entries": 0, "tools": out}
+        for field, value in raw.items():
+            tool_id, _, kind = field.decode("utf-8").rpartition(":")
+            out.setdefault(tool_id, {"hits": 0, "misses": 0})[kind] = int(value)
+        return {"entries": entries, "tools": out}
+
+tool_cache = ToolResultCache()
@@ -0,0 +1,101 @@
+# Módulo: token de cancelación por scan
+import threading
+from contextlib import contextmanager
+import redis as redislib
+from .config import settings
+
+r = redislib.from_url(settings.REDIS_URL, decode_responses=True)
+
+class CancelToken:
+    """Bandera de parada de un scan vigilada por un hilo en segundo plano.
+
+    El hilo hace un único GET de ``scan:{id}:stop`` cada ``STOP_POLL_SECONDS``;
+    los plugins consultan ``cancelled`` sin coste y pueden registrar callbacks
+    (p.ej. terminar el subproceso) que se ejecutan en cuanto llega la parada.
+    """
+
+    def __init__(self, scan_id: int, poll_seconds: float | None = None):
+        self.scan_id = scan_id
+        self.poll_seconds = settings.STOP_POLL_SECONDS if poll_seconds is None else poll_seconds
+        self._event = threading.Event()
+        self._closed = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: list = []
+        self._thread: threading.Thread | None = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def _check(self) -> None:
+        try:
+            if r.get(f"scan:{self.scan_id}:stop") == "1":
+                self.cancel()
+        except Exception:
+            pass
+
+    def start(self) -> "CancelToken":
+        self._check()
+        if not self.cancelled:
+            self._thread = threading.Thread(target=self._watch, name=f"cancel-scan-{self.scan_id}", daemon=True)
+            self._thread.start()
+        return self
+
+    def _watch(self) -> None:
+        while not self._closed.wait(self.poll_seconds):
+            self._check()
+            if self.cancelled:
+                break
+
+    def close(self) -> None:
+        self._closed.set()
+
+    def cancel(self) -> None:
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            try:
+                fn()
+            except Exception:
+                pass
+
+    def on_cancel(self, fn):
+        """Registra ``fn`` para ejecutarse al cancelar; devuelve una función para desregistrarla."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(fn)
+                return lambda: self._discard(fn)
+        fn()
+        return lambda: None
+
+    def _discard(self, fn) -> None:
+        with self._lock:
+            try:
+                self._callbacks.remove(fn)
+            except ValueError:
+                pass
+
+# Un token (y un hilo vigilante) por scan y proceso, compartido entre las herramientas que corren en él
+_tokens: dict[int, tuple[CancelToken, int]] = {}
+_tokens_lock = threading.Lock()
+
+@contextmanager
+def cancel_token(scan_id: int):
+    with _tokens_lock:
+        token, refs = _tokens.get(scan_id, (None, 0))
+        if token is None:
+            token = CancelToken(scan_id).start()
+        _tokens[scan_id] = (token, refs + 1)
+    try:
+        yield token
+    finally:
+        with _tokens_lock:
+            token, refs = _tokens[scan_id]
+            if refs <= 1:
+                _tokens.pop(scan_id, None)
+                token.close()
+            else:
+                _tokens[scan_id] = (token, refs - 1)
@@ -9,6 +9,16 @@ celery.conf.beat_schedule = {
         "schedule": 60.0,
         "args": [],
     },
+    "rebuild-summary": {
+        "task": "app.tasks.rebuild_summary",
+        "schedule": 60.0 * 60,
+        "args": [],
+    },
+    "sweep-deleted": {
+        "task": "app.tasks.sweep_deleted",
+        "schedule": 60.0 * 15,
+        "args": [],
+    },
     # Ejemplo: escaneo diario (ajustable vía API en futuro)
     # "daily-demo-scan": {
     #     "task": "app.tasks.run_scheduled_scan",
@@ -16,5 +26,12 @@ celery.conf.beat_schedule = {
     #     "args": ["example.com", ["amass","subfinder"]],
     # },
 }
+# Colas por perfil de recursos (ver app/routing.py); lo no enrutado va a la cola de control
+celery.conf.task_default_queue = "control"
+celery.conf.task_routes = ("app.routing.route_task",)
+# Cada worker reserva solo la tarea en curso: un escaneo largo no retiene otras en su buffer
+celery.conf.worker_prefetch_multiplier = 1
 celery.conf.beat_schedule_filename = "/tmp/celerybeat-schedule"
-celery.conf.update(imports=("app.tasks",))
\ No newline at end of file
+celery.conf.update(imports=("app.tasks",))
+# Hooks de métricas (espera en cola, duración por tarea, exporter del worker)
+from . import metrics  # noqa: E402,F401
@@ -0,0 +1,100 @@
+# Módulo: feed de cambios de scans y schedules
+# Cada commit que crea, modifica o borra Scan/Schedule incrementa un contador de versión en Redis y
+# publica los cambios en el canal FEED_CHANNEL (un único viaje, script Lua). El hub de la API los
+# reparte por WebSocket (/ws/changes) y la versión sirve de ETag para los listados, de modo que un
+# dashboard inactivo no consulta la BD.
+import time
+import orjson
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+import redis as redislib
+import redis.asyncio as aredis
+from .config import settings
+from .models import Scan, Schedule
+from .schemas import ScanOut, ScheduleOut
+from .metrics import REDIS_PUBLISH
+
+r = redislib.from_url(settings.REDIS_URL, decode_responses=True)
+ar = aredis.from_url(settings.REDIS_URL, decode_responses=True)  # para los endpoints async
+
+FEED_CHANNEL = "changes"
+KINDS = {"scans": (Scan, ScanOut), "schedules": (Schedule, ScheduleOut)}
+
+def version_key(kind: str) -> str:
+    return f"changes:{kind}:version"
+
+# La versión arranca en el reloj de Redis (ms): si la clave se pierde, no se reutilizan ETags antiguos
+_publish_changes = r.register_script("""
+if redis.call('EXISTS', KEYS[1]) == 0 then
+  local t = redis.call('TIME')
+  redis.call('SET', KEYS[1], t[1] * 1000 + math.floor(t[2] / 1000))
+end
+local v = redis.call('INCR', KEYS[1])
+redis.call('PUBLISH', KEYS[2], '{"kind":"' .. ARGV[1] .. '","version":' .. v .. ',"items":' .. ARGV[2] .. '}')
+return v
+""")
+
+def _dumps(value) -> str:
+    # Mismo formato que los listados REST (orjson, fechas ISO 8601 con "Z" en UTC)
+    return orjson.dumps(value, default=str, option=orjson.OPT_UTC_Z).decode()
+
+def publish(kind: str, items: list[dict]) -> None:
+    """Publica cambios (parches por id; ``deleted`` para borrados) y avanza la versión del listado."""
+    if not items:
+        return
+    try:
+        _publish_changes(keys=[version_key(kind), FEED_CHANNEL], args=[kind, _dumps(items)])
+        REDIS_PUBLISH.labels(kind="changes").inc()
+    except Exception:
+        pass
+
+def publish_progress(scan_id: int, **fields) -> None:
+    # Progreso (herramientas, objetivos procesados): no cambia los listados, no avanza la versión
+    try:
+        r.publish(FEED_CHANNEL, _dumps({"kind": "progress", "items": [{"id": scan_id, **fields}]}))
+        REDIS_PUBLISH.labels(kind="progress").inc()
+    except Exception:
+        pass
+
+async def aversion(kind: str) -> str | None:
+    try:
+        await ar.set(version_key(kind), int(time.time() * 1000), nx=True)
+        return await ar.get(version_key(kind))
+    except Exception:
+        return None
+
+async def etag(kind: str) -> str | None:
+    v = await aversion(kind)
+    return f'"{kind}-{v}"' if v else None
+
+def _patch(obj, schema) -> dict:
+    # Solo los campos ya cargados: serializar no dispara SELECTs de atributos expirados
+    unloaded = inspect(obj).unloaded
+    return {f: getattr(obj, f) for f in schema.model_fields if f not in unloaded and hasattr(obj, f)}
+
+# Los cambios se capturan en el flush (historial aún disponible) y se publican solo si hay commit
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session, flush_context):
+    pending = session.info.setdefault("changes", {})
+    for kind, (model, schema) in KINDS.items():
+        for obj in session.new:
+            if isinstance(obj, model):
+                pending.setdefault(kind, {})[obj.id] = _patch(obj, schema)
+        for obj in session.dirty:
+            if isinstance(obj, model) and obj.__dict__.get("deleted_at") is not None:
+                # Borrado lógico (o cambio tardío de un worker sobre un scan ya borrado): para el cliente es un borrado
+                pending.setdefault(kind, {})[obj.id] = {"id": obj.id, "deleted": True}
+            elif isinstance(obj, model) and session.is_modified(obj, include_collections=False):
+                pending.setdefault(kind, {}).setdefault(obj.id, {}).update(_patch(obj, schema))
+        for obj in session.deleted:
+            if isinstance(obj, model):
+                pending.setdefault(kind, {})[obj.id] = {"id": obj.id, "deleted": True}
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending(session):
+    for kind, items in session.info.pop("changes", {}).items():
+        publish(kind, list(items.values()))
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session):
+    session.info.pop("changes", None)
@@ -2,10 +2,83 @@ import os
 
 class Settings:
     DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./osint.db")
+    # Pool de conexiones por proceso (los workers de hilos necesitan una conexión por hilo)
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    # Motor async de la API (asyncpg / aiosqlite; vacío = derivado de DATABASE_URL): pool propio,
+    # espera máxima por una conexión libre (s) y timeout por sentencia en PostgreSQL (ms, 0 = sin límite)
+    DB_ASYNC_URL = os.getenv("DB_ASYNC_URL", "")
+    DB_ASYNC_POOL_SIZE = int(os.getenv("DB_ASYNC_POOL_SIZE", "20"))
+    DB_ASYNC_MAX_OVERFLOW = int(os.getenv("DB_ASYNC_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
     REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
     SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret")
     HIBP_API_KEY = os.getenv("HIBP_API_KEY", "")
     SPIDERFOOT_URL = os.getenv("SPIDERFOOT_URL", "")
     TZ = os.getenv("TZ", "UTC")
+    # Ejecutar las herramientas de un scan como subtareas paralelas (1) o en serie (0)
+    SCAN_PARALLEL = os.getenv("SCAN_PARALLEL", "1") == "1"
+    # Ingesta de hallazgos: volcado a BD cada N elementos o cada N segundos
+    INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "500"))
+    INGEST_FLUSH_SECONDS = float(os.getenv("INGEST_FLUSH_SECONDS", "2"))
+    # En PostgreSQL (psycopg2) usar COPY para la inserción masiva
+    INGEST_USE_COPY = os.getenv("INGEST_USE_COPY", "1") == "1"
+    # Cada cuánto revisa el hilo vigilante la clave de parada de un scan (segundos)
+    STOP_POLL_SECONDS = float(os.getenv("STOP_POLL_SECONDS", "0.5"))
+    # Logs de scan: lote de líneas por escritura, espera máxima y tamaño/TTL del stream
+    LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "50"))
+    LOG_FLUSH_SECONDS = float(os.getenv("LOG_FLUSH_SECONDS", "0.5"))
+    LOG_STREAM_MAXLEN = int(os.getenv("LOG_STREAM_MAXLEN", "5000"))
+    LOG_STREAM_TTL = int(os.getenv("LOG_STREAM_TTL", str(7 * 24 * 3600)))
+    # WebSocket de logs: lotes en cola por cliente (se descartan los más antiguos) y lotes por frame
+    LOG_CLIENT_QUEUE = int(os.getenv("LOG_CLIENT_QUEUE", "200"))
+    LOG_FRAME_MAX_ENTRIES = int(os.getenv("LOG_FRAME_MAX_ENTRIES", "20"))
+
+    # Vida de los conjuntos de claves por scan usados para el diff con el siguiente scan
+    DIFF_KEYS_TTL = int(os.getenv("DIFF_KEYS_TTL", str(30 * 24 * 3600)))
+    # Despacho de schedules: filas por lote y por tick, jitter, límites de scans activos (0 = sin límite)
+    SCHEDULE_BATCH_SIZE = int(os.getenv("SCHEDULE_BATCH_SIZE", "100"))
+    SCHEDULE_MAX_PER_TICK = int(os.getenv("SCHEDULE_MAX_PER_TICK", "1000"))
+    SCHEDULE_JITTER_SECONDS = float(os.getenv("SCHEDULE_JITTER_SECONDS", "30"))
+    SCHEDULE_DEFER_SECONDS = int(os.getenv("SCHEDULE_DEFER_SECONDS", "120"))
+    SCHEDULE_MAX_ACTIVE_PER_PROJECT = int(os.getenv("SCHEDULE_MAX_ACTIVE_PER_PROJECT", "10"))
+    SCHEDULE_MAX_ACTIVE_PER_TARGET = int(os.getenv("SCHEDULE_MAX_ACTIVE_PER_TARGET", "2"))
+    # Caché de resultados de herramientas pasivas (opt-in): TTL, entradas máximas y hallazgos máximos por entrada
+    TOOL_CACHE_ENABLED = os.getenv("TOOL_CACHE_ENABLED", "0") == "1"
+    TOOL_CACHE_TTL = int(os.getenv("TOOL_CACHE_TTL", "3600"))
+    TOOL_CACHE_MAX_ENTRIES = int(os.getenv("TOOL_CACHE_MAX_ENTRIES", "500"))
+    TOOL_CACHE_MAX_ITEMS = int(os.getenv("TOOL_CACHE_MAX_ITEMS", "20000"))
+    # Cliente HTTP de plugins: timeout, conexiones por proceso, reintentos y espera máxima entre ellos
+    HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "20"))
+    HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+    HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "3"))
+    HTTP_MAX_BACKOFF = float(os.getenv("HTTP_MAX_BACKOFF", "30"))
+    # HIBP: peticiones por minuto permitidas por la API key y consultas concurrentes por lote
+    HIBP_RATE_PER_MINUTE = float(os.getenv("HIBP_RATE_PER_MINUTE", "10"))
+    HIBP_CONCURRENCY = int(os.getenv("HIBP_CONCURRENCY", "10"))
+    # Scans masivos: objetivos por lote, carriles (tareas) en paralelo y máximo de objetivos aceptados
+    BULK_SHARD_SIZE = int(os.getenv("BULK_SHARD_SIZE", "25"))
+    BULK_LANES = int(os.getenv("BULK_LANES", "8"))
+    BULK_MAX_TARGETS = int(os.getenv("BULK_MAX_TARGETS", "50000"))
+    # Subprocesos de herramientas: tiempo máximo, tiempo sin salida, gracia SIGTERM→SIGKILL,
+    # límites de memoria/CPU (0 = sin límite) y ejecuciones simultáneas por binario en todo el clúster
+    RUNNER_WALL_TIMEOUT = float(os.getenv("RUNNER_WALL_TIMEOUT", "3600"))
+    RUNNER_IDLE_TIMEOUT = float(os.getenv("RUNNER_IDLE_TIMEOUT", "600"))
+    RUNNER_KILL_GRACE = float(os.getenv("RUNNER_KILL_GRACE", "5"))
+    RUNNER_MAX_MEMORY_MB = int(os.getenv("RUNNER_MAX_MEMORY_MB", "4096"))
+    RUNNER_MAX_CPU_SECONDS = int(os.getenv("RUNNER_MAX_CPU_SECONDS", "3600"))
+    RUNNER_MAX_PER_BINARY = int(os.getenv("RUNNER_MAX_PER_BINARY", "4"))
+    # Puerto del exporter Prometheus de cada worker Celery (0 = desactivado)
+    METRICS_PORT = int(os.getenv("METRICS_PORT", "9808"))
+    # Purga en segundo plano de proyectos/scans borrados: filas por DELETE (un commit por lote),
+    # minutos tras los que un borrado sin purgar se reintenta, espera máxima a que paren las herramientas
+    # de un scan borrado en curso (pasado ese plazo se da su tarea por muerta) y vida de los jobs en Redis
+    PURGE_CHUNK_ROWS = int(os.getenv("PURGE_CHUNK_ROWS", "5000"))
+    PURGE_RETRY_MINUTES = int(os.getenv("PURGE_RETRY_MINUTES", "60"))
+    PURGE_ACTIVE_WAIT_MINUTES = int(os.getenv("PURGE_ACTIVE_WAIT_MINUTES", "30"))
+    JOB_TTL = int(os.getenv("JOB_TTL", str(7 * 24 * 3600)))
+    # Directorio compartido (API y workers) para los reportes PDF generados
+    REPORTS_DIR = os.getenv("REPORTS_DIR", "./reports")
 
 settings = Settings()
\ No newline at end of file
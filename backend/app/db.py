@@ -1,14 +1,75 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from .config import settings
 
-engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
+engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True,
+                       pool_size=settings.DB_POOL_SIZE, max_overflow=settings.DB_MAX_OVERFLOW)
+def _sqlite_foreign_keys(engine) -> None:
+    # SQLite no aplica las claves foráneas (ni ON DELETE CASCADE) salvo que se active por conexión
+    if engine.dialect.name == "sqlite":
+        @event.listens_for(engine, "connect")
+        def _enable(dbapi_conn, record):
+            cur = dbapi_conn.cursor()
+            cur.execute("PRAGMA foreign_keys=ON")
+            cur.close()
+
+_sqlite_foreign_keys(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+def async_database_url(url: str) -> str:
+    # Mismo servidor con el driver async: asyncpg para PostgreSQL, aiosqlite en local
+    scheme, sep, rest = url.partition("://")
+    if scheme.startswith("postgresql") or scheme == "postgres":
+        return f"postgresql+asyncpg{sep}{rest}"
+    if scheme.startswith("sqlite"):
+        return f"sqlite+aiosqlite{sep}{rest}"
+    return url
+
+def _async_engine():
+    url = settings.DB_ASYNC_URL or async_database_url(settings.DATABASE_URL)
+    if url.startswith("sqlite"):
+        # aiosqlite abre una conexión por sesión (NullPool): no admite parámetros de pool
+        return create_async_engine(url)
+    connect_args = {}
+    if url.startswith("postgresql+asyncpg") and settings.DB_STATEMENT_TIMEOUT_MS > 0:
+        # Una consulta lenta (exportación, filtro sin índice) se corta en el servidor en lugar de retener la conexión
+        connect_args["server_settings"] = {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}
+    return create_async_engine(url, pool_pre_ping=True, pool_size=settings.DB_ASYNC_POOL_SIZE,
+                               max_overflow=settings.DB_ASYNC_MAX_OVERFLOW, pool_timeout=settings.DB_POOL_TIMEOUT,
+                               connect_args=connect_args)
+
+# Solo lo usa la API (endpoints de lectura calientes); los workers Celery siguen con SessionLocal
+async_engine = _async_engine()
+_sqlite_foreign_keys(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def ensure_schema():
+    """create_all + lo que create_all no hace sobre tablas existentes: columnas e índices nuevos."""
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        insp = inspect(conn)
+        for table in Base.metadata.sorted_tables:
+            existing = {c["name"] for c in insp.get_columns(table.name)}
+            for col in table.columns:
+                if col.name not in existing:
+                    coltype = col.type.compile(dialect=conn.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {col.name} {coltype}"))
+    for table in Base.metadata.sorted_tables:
+        for idx in table.indexes:
+            try:
+                idx.create(bind=engine, checkfirst=True)
+            except Exception:
+                pass
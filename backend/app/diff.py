@@ -0,0 +1,126 @@
+# Módulo: diff incremental entre un scan y el anterior del mismo schedule/objetivo
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+import redis as redislib
+from .config import settings
+from .models import Scan, Finding, ScanDelta, ScanDiff
+
+r = redislib.from_url(settings.REDIS_URL, decode_responses=True)
+
+# Categorías que no representan activos y no entran en el diff
+IGNORED_CATEGORIES = {"error"}
+
+def normalize_value(value) -> str:
+    return str(value).strip().lower().rstrip(".")
+
+def finding_key(category: str, value) -> str:
+    return f"{category}\x1f{normalize_value(value)}"
+
+def keys_set(scan_id: int) -> str:
+    # Conjunto Redis con las claves (categoría, valor normalizado) vistas en un scan
+    return f"scan:{scan_id}:keys"
+
+def _split_key(key: str) -> tuple[str, str]:
+    category, _, value = key.partition("\x1f")
+    return category, value
+
+def resolve_base_scan(db: Session, scan: Scan) -> int | None:
+    q = db.query(Scan.id).filter(Scan.id < scan.id, Scan.status == "completed", Scan.deleted_at.is_(None))
+    if scan.schedule_id is not None:
+        q = q.filter(Scan.schedule_id == scan.schedule_id)
+    else:
+        q = q.filter(Scan.project_id == scan.project_id, Scan.target == scan.target)
+    row = q.order_by(Scan.id.desc()).first()
+    return row[0] if row else None
+
+def _rebuild_keys(db: Session, scan_id: int) -> None:
+    # El conjunto del scan base expiró (o nunca existió): reconstruirlo desde la BD una sola vez
+    pipe = r.pipeline(transaction=False)
+    n = 0
+    q = (
+        db.query(Finding.category, Finding.value)
+        .filter(Finding.scan_id == scan_id)
+        .yield_per(settings.INGEST_BATCH_SIZE)
+    )
+    for category, value in q:
+        if category in IGNORED_CATEGORIES:
+            continue
+        pipe.sadd(keys_set(scan_id), finding_key(category, value))
+        n += 1
+        if n % settings.INGEST_BATCH_SIZE == 0:
+            pipe.execute()
+    pipe.expire(keys_set(scan_id), settings.DIFF_KEYS_TTL)
+    pipe.execute()
+
+def prepare_diff(db: Session, scan: Scan) -> None:
+    """Fija el scan base y deja listos los conjuntos antes de que empiece la ingesta."""
+    scan.base_scan_id = resolve_base_scan(db, scan)
+    db.execute(delete(ScanDelta).where(ScanDelta.scan_id == scan.id))
+    db.execute(delete(ScanDiff).where(ScanDiff.scan_id == scan.id))
+    db.commit()
+    try:
+        r.delete(keys_set(scan.id))
+        if scan.base_scan_id and not r.exists(keys_set(scan.base_scan_id)):
+            _rebuild_keys(db, scan.base_scan_id)
+    except Exception:
+        pass
+
+class DiffTracker:
+    """Marca como nuevos, en el momento de escribir, los hallazgos que no estaban en el scan base."""
+
+    def __init__(self, scan: Scan):
+        self.scan_id = scan.id
+        self.base_scan_id = scan.base_scan_id
+
+    def track(self, db: Session, items: list[dict]) -> None:
+        keys, tools = [], {}
+        for item in items:
+            category = item.get("category", "info")
+            if category in IGNORED_CATEGORIES:
+                continue
+            key = finding_key(category, item.get("value", ""))
+            if key not in tools:
+                keys.append(key)
+                tools[key] = item.get("tool", "unknown")
+        if not keys:
+            return
+        cur = keys_set(self.scan_id)
+        pipe = r.pipeline(transaction=False)
+        for key in keys:
+            pipe.sadd(cur, key)
+        pipe.expire(cur, settings.DIFF_KEYS_TTL)
+        added = [key for key, ok in zip(keys, pipe.execute()) if ok]
+        if not added or not self.base_scan_id:
+            return
+        in_base = r.smismember(keys_set(self.base_scan_id), added)
+        rows = []
+        for key, seen in zip(added, in_base):
+            if not seen:
+                category, value = _split_key(key)
+                rows.append({"scan_id": self.scan_id, "base_scan_id": self.base_scan_id, "change": "new",
+                             "category": category, "value": value[:500], "tool": tools[key]})
+        if rows:
+            db.execute(insert(ScanDelta), rows)
+            db.commit()
+
+def finalize_diff(db: Session, scan: Scan) -> None:
+    """Al terminar el scan: desaparecidos = base - actual (solo si terminó completo) y resumen de conteos."""
+    if not scan.base_scan_id:
+        return
+    base, cur = keys_set(scan.base_scan_id), keys_set(scan.id)
+    new_count = db.query(ScanDelta).filter(ScanDelta.scan_id == scan.id, ScanDelta.change == "new").count()
+    gone_count = 0
+    if scan.status == "completed":
+        gone = list(r.sdiff(base, cur))
+        gone_count = len(gone)
+        for i in range(0, len(gone), settings.INGEST_BATCH_SIZE):
+            rows = []
+            for key in gone[i:i + settings.INGEST_BATCH_SIZE]:
+                category, value = _split_key(key)
+                rows.append({"scan_id": scan.id, "base_scan_id": scan.base_scan_id, "change": "gone",
+                             "category": category, "value": value[:500], "tool": None})
+            db.execute(insert(ScanDelta), rows)
+    persisted = max(0, (r.scard(cur) or 0) - new_count)
+    db.merge(ScanDiff(scan_id=scan.id, base_scan_id=scan.base_scan_id, new_count=new_count,
+                      gone_count=gone_count, persisted_count=persisted))
+    db.commit()
@@ -1,35 +1,189 @@
 import csv
+import glob
+import hashlib
 import io
+import json
+import os
+import zlib
+from typing import Iterable, Iterator
+import redis as redislib
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
+from sqlalchemy import case, func
 from sqlalchemy.orm import Session
-from .models import Scan, Finding
+from .config import settings
+from .db import SessionLocal
+from .models import ACTIVE_STATUSES, Scan, Finding
 
-def export_csv(db: Session, scan_id: int) -> bytes:
+r = redislib.from_url(settings.REDIS_URL, decode_responses=True)
+
+# Filas por viaje del cursor de servidor y por chunk enviado al cliente
+EXPORT_CHUNK_ROWS = 1000
+
+def _iter_rows(scan_id: int) -> Iterator[tuple]:
+    # Sesión propia: el generador vive más que la dependencia get_db de la petición
+    db = SessionLocal()
+    try:
+        q = (
+            db.query(Finding.id, Finding.tool, Finding.category, Finding.value, Finding.severity, Finding.meta)
+            .filter(Finding.scan_id == scan_id)
+            .order_by(Finding.id)
+            .yield_per(EXPORT_CHUNK_ROWS)
+        )
+        yield from q
+    finally:
+        db.close()
+
+def iter_csv(scan_id: int) -> Iterator[bytes]:
     output = io.StringIO()
     writer = csv.writer(output)
     writer.writerow(["tool","category","value","severity","meta"])
-    for f in db.query(Finding).filter(Finding.scan_id==scan_id).all():
-        writer.writerow([f.tool, f.category, f.value, f.severity, f.meta])
-    return output.getvalue().encode("utf-8")
-
-def export_pdf(db: Session, scan_id: int) -> bytes:
-    scan = db.query(Scan).get(scan_id)
-    findings = db.query(Finding).filter(Finding.scan_id==scan_id).all()
-    buf = io.BytesIO()
-    c = canvas.Canvas(buf, pagesize=A4)
-    c.setTitle(f"Reporte OSINT Scan #{scan_id}")
-    c.drawString(40, 800, f"Scan #{scan_id} - Target: {scan.target} - Status: {scan.status}")
-    c.drawString(40, 780, f"Herramientas: {', '.join(scan.tools)}")
-    y = 760
-    for f in findings[:40]:  # limitar para demo
-        c.drawString(40, y, f"[{f.tool}] {f.category}: {f.value}")
-        y -= 16
-        if y < 60:
-            c.showPage()
-            y = 800
-    c.showPage()
-    c.save()
-    pdf = buf.getvalue()
-    buf.close()
-    return pdf
\ No newline at end of file
+    yield output.getvalue().encode("utf-8")
+    output.seek(0); output.truncate()
+    n = 0
+    for _id, tool, category, value, severity, meta in _iter_rows(scan_id):
+        writer.writerow([tool, category, value, severity, meta])
+        n += 1
+        if n % EXPORT_CHUNK_ROWS == 0:
+            yield output.getvalue().encode("utf-8")
+            output.seek(0); output.truncate()
+    if output.tell():
+        yield output.getvalue().encode("utf-8")
+
+def iter_ndjson(scan_id: int) -> Iterator[bytes]:
+    buf = []
+    for _id, tool, category, value, severity, meta in _iter_rows(scan_id):
+        buf.append(json.dumps({"id": _id, "tool": tool, "category": category, "value": value,
+                               "severity": severity, "meta": meta}, default=str))
+        if len(buf) >= EXPORT_CHUNK_ROWS:
+            yield ("\n".join(buf) + "\n").encode("utf-8")
+            buf = []
+    if buf:
+        yield ("\n".join(buf) + "\n").encode("utf-8")
+
+def gzip_stream(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    # wbits=31 -> contenedor gzip, comprimido al vuelo chunk a chunk
+    comp = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        out = comp.compress(chunk)
+        if out:
+            yield out
+    yield comp.flush()
+
+# Reportes PDF: se renderizan en un worker y se guardan como artefacto por (scan, versión de hallazgos)
+_SEVERITY_ORDER = {"critical": 0, "high": 1, "medium": 2, "low": 3, "info": 4}
+
+def _version_key(scan_id: int) -> str:
+    return f"report:{scan_id}:version"
+
+def forget_report_version(scan_id: int) -> None:
+    # La ingesta invalida la versión cacheada (hallazgos tardíos de un scan ya parado)
+    try:
+        r.delete(_version_key(scan_id))
+    except Exception:
+        pass
+
+def report_version(db: Session, scan: Scan) -> str:
+    # Cambia cuando entran hallazgos nuevos o cuando cambia el estado del scan. Un scan terminado ya no
+    # recibe hallazgos: su versión se guarda en Redis, ligada a (estado, finished_at) para que un
+    # relanzamiento la invalide, y las descargas repetidas no vuelven a agregar sus hallazgos
+    finished = scan.status not in ACTIVE_STATUSES
+    stamp = f"{scan.status}|{scan.finished_at.isoformat() if scan.finished_at else ''}|"
+    cache_key = _version_key(scan.id)
+    if finished:
+        try:
+            cached = r.get(cache_key)
+            if cached and cached.startswith(stamp):
+                return cached[len(stamp):]
+        except Exception:
+            pass
+    count, max_id = db.query(func.count(Finding.id), func.max(Finding.id)).filter(Finding.scan_id == scan.id).one()
+    key = f"{scan.id}:{count}:{max_id or 0}:{scan.status}"
+    version = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+    if finished:
+        try:
+            r.set(cache_key, stamp + version, ex=86400)
+        except Exception:
+            pass
+    return version
+
+def report_path(scan_id: int, version: str) -> str:
+    return os.path.join(settings.REPORTS_DIR, f"scan_{scan_id}_{version}.pdf")
+
+def _clip(text: str, limit: int = 95) -> str:
+    text = str(text)
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+def render_pdf_report(scan_id: int, version: str) -> str | None:
+    db = SessionLocal()
+    try:
+        scan = db.query(Scan).get(scan_id)
+        if not scan:
+            return None
+        summary = (
+            db.query(Finding.category, Finding.severity, func.count(Finding.id))
+            .filter(Finding.scan_id == scan_id)
+            .group_by(Finding.category, Finding.severity)
+            .all()
+        )
+        summary.sort(key=lambda row: (row[0], _SEVERITY_ORDER.get(row[1], 9), row[1]))
+
+        path = report_path(scan_id, version)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        c = canvas.Canvas(tmp, pagesize=A4)
+        c.setTitle(f"Reporte OSINT Scan #{scan_id}")
+        y = 800
+
+        def row(cols: list[tuple[int, str]], step: int = 14, font: str = "Helvetica", size: int = 9):
+            nonlocal y
+            if y < 60:
+                c.showPage()
+                y = 800
+            c.setFont(font, size)
+            for x, text in cols:
+                c.drawString(x, y, text)
+            y -= step
+
+        def line(text: str, x: int = 40, **kw):
+            row([(x, text)], **kw)
+
+        line(f"Scan #{scan_id} - Target: {scan.target} - Status: {scan.status}", font="Helvetica-Bold", size=11, step=18)
+        line(f"Herramientas: {', '.join(scan.tools or [])}", step=18)
+        line(f"Total hallazgos: {sum(n for _, _, n in summary)}", step=22)
+
+        # Tabla resumen por categoría y severidad
+        row([(40, "Categoría"), (260, "Severidad"), (420, "Hallazgos")], font="Helvetica-Bold")
+        for category, severity, n in summary:
+            row([(40, _clip(category, 40)), (260, str(severity)), (420, str(n))])
+        y -= 10
+
+        # Detalle completo, agrupado por categoría y severidad, leído en streaming
+        severity_rank = case(_SEVERITY_ORDER, value=Finding.severity, else_=9)
+        q = (
+            db.query(Finding.tool, Finding.category, Finding.severity, Finding.value)
+            .filter(Finding.scan_id == scan_id)
+            .order_by(Finding.category, severity_rank, Finding.severity, Finding.id)
+            .yield_per(EXPORT_CHUNK_ROWS)
+        )
+        group = None
+        for tool, category, severity, value in q:
+            if (category, severity) != group:
+                group = (category, severity)
+                y -= 6
+                line(f"{category} / {severity}", font="Helvetica-Bold", size=10, step=16)
+            line(_clip(f"[{tool}] {value}"), x=50)
+        c.showPage()
+        c.save()
+        os.replace(tmp, path)
+
+        # Las versiones anteriores del mismo scan ya no se sirven
+        for old in glob.glob(os.path.join(settings.REPORTS_DIR, f"scan_{scan_id}_*.pdf")):
+            if old != path:
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass
+        return path
+    finally:
+        db.close()
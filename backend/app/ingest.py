@@ -0,0 +1,150 @@
+# Módulo: ingesta por lotes de hallazgos
+import io
+import json
+import time
+from collections import Counter
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+from .config import settings
+from .models import Scan, Finding
+from .diff import DiffTracker
+from .assets import upsert_assets
+from .summary import record_findings
+from .exports import forget_report_version
+from .metrics import FINDINGS, SAVE_FINDINGS_ROWS, SAVE_FINDINGS_SECONDS, timer
+
+def _copy_text(value) -> str:
+    # Formato texto de COPY: NULL como \N y escapes de barra, tabulador y saltos de línea
+    if value is None:
+        return "\\N"
+    return value.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+def _finding_rows(scan_id: int, findings: list[dict]) -> list[dict]:
+    rows = []
+    for item in findings:
+        raw = item.get("raw")
+        rows.append({
+            "scan_id": scan_id,
+            "tool": item.get("tool", "unknown"),
+            "category": item.get("category", "info"),
+            "value": str(item.get("value", "")),
+            "severity": item.get("severity", "info"),
+            "meta": item.get("meta", {}),
+            "raw": (json.dumps(raw) if raw is not None else None),
+        })
+    return rows
+
+_COPY_SQL = "COPY findings (scan_id, tool, category, value, severity, meta, raw) FROM STDIN"
+
+def _copy_findings(db: Session, rows: list[dict]) -> None:
+    buf = io.StringIO()
+    for row in rows:
+        buf.write("\t".join((
+            str(row["scan_id"]),
+            _copy_text(row["tool"]),
+            _copy_text(row["category"]),
+            _copy_text(row["value"]),
+            _copy_text(row["severity"]),
+            _copy_text(json.dumps(row["meta"])),
+            _copy_text(row["raw"]),
+        )))
+        buf.write("\n")
+    buf.seek(0)
+    cur = db.connection().connection.cursor()
+    try:
+        cur.copy_expert(_COPY_SQL, buf)
+    finally:
+        cur.close()
+
+def _use_copy(db: Session) -> bool:
+    dialect = db.get_bind().dialect
+    return settings.INGEST_USE_COPY and dialect.name == "postgresql" and dialect.driver == "psycopg2"
+
+# Función utilitaria para persistir hallazgos: inserción masiva (COPY en PostgreSQL, executemany en el resto)
+def save_findings(db: Session, scan: Scan, findings: list[dict], batch_size: int | None = None) -> None:
+    if not findings:
+        return
+    batch_size = max(1, batch_size or settings.INGEST_BATCH_SIZE)
+    use_copy = _use_copy(db)
+    method = "copy" if use_copy else "insert"
+    table = Finding.__table__
+    with timer(SAVE_FINDINGS_SECONDS, method=method):
+        for i in range(0, len(findings), batch_size):
+            rows = _finding_rows(scan.id, findings[i:i + batch_size])
+            if use_copy:
+                _copy_findings(db, rows)
+            else:
+                db.execute(insert(table), rows)
+        db.commit()
+    record_findings(scan, findings)
+    forget_report_version(scan.id)
+    SAVE_FINDINGS_ROWS.labels(method=method).inc(len(findings))
+
+def _scan_deleted(db: Session, scan: Scan) -> bool:
+    # Consulta directa: el borrado lo hace otra sesión y la fila puede haber sido purgada ya
+    row = db.execute(select(Scan.deleted_at).where(Scan.id == scan.id)).first()
+    return row is None or row[0] is not None
+
+class FindingsIngestor:
+    """Recibe hallazgos en streaming y los persiste por lotes.
+
+    Vacía el buffer al llegar a ``batch_size`` elementos o cuando han pasado
+    ``flush_seconds`` desde el último volcado, de modo que la memoria queda
+    acotada y los hallazgos son consultables mientras la herramienta sigue corriendo.
+    Si la herramienta calla, ``tick`` (registrado con ``runner.on_idle``) aplica el mismo plazo.
+    """
+
+    def __init__(self, db: Session, scan: Scan, batch_size: int | None = None, flush_seconds: float | None = None):
+        self.db = db
+        self.scan = scan
+        self.batch_size = max(1, batch_size or settings.INGEST_BATCH_SIZE)
+        self.flush_seconds = settings.INGEST_FLUSH_SECONDS if flush_seconds is None else flush_seconds
+        self.count = 0
+        self.deleted = False
+        self.diff = DiffTracker(scan)
+        self._buffer: list[dict] = []
+        self._last_flush = time.monotonic()
+
+    def add(self, item: dict) -> None:
+        self._buffer.append(item)
+        if len(self._buffer) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_seconds:
+            self.flush()
+
+    def tick(self) -> None:
+        # Volcado por tiempo aunque no lleguen hallazgos nuevos (ráfaga seguida de silencio)
+        if self._buffer and time.monotonic() - self._last_flush >= self.flush_seconds:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._buffer and not self.deleted:
+            # Un scan borrado a mitad de ejecución no debe volver a sumar al resumen ni a los assets
+            self.deleted = _scan_deleted(self.db, self.scan)
+        if self.deleted:
+            self._buffer = []
+        if self._buffer:
+            batch, self._buffer = self._buffer, []
+            save_findings(self.db, self.scan, batch)
+            self.count += len(batch)
+            for tool, n in Counter(item.get("tool", "unknown") for item in batch).items():
+                FINDINGS.labels(tool=tool).inc(n)
+            try:
+                self.diff.track(self.db, batch)
+            except Exception:
+                self.db.rollback()
+            try:
+                upsert_assets(self.db, self.scan, batch)
+            except Exception:
+                self.db.rollback()
+        self._last_flush = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Persistir lo ya recibido aunque la herramienta haya fallado a mitad
+        try:
+            self.flush()
+        except Exception:
+            if exc_type is None:
+                raise
+        return False
@@ -0,0 +1,170 @@
+# Módulo: hub asyncio de logs y del feed de cambios para los WebSockets
+import asyncio
+import json
+import redis.asyncio as aredis
+from .config import settings
+from .logs import parse_id, read_backlog
+from .changes import FEED_CHANNEL
+
+class LogClient:
+    """Cola acotada de un WebSocket; si el cliente no da abasto se descartan los lotes más antiguos."""
+
+    def __init__(self, scan_id: int, maxsize: int):
+        self.scan_id = scan_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def push(self, entry_id: str, lines: list[str]) -> None:
+        if self.queue.full():
+            try:
+                self.queue.get_nowait()
+                self.dropped += 1
+            except asyncio.QueueEmpty:
+                pass
+        self.queue.put_nowait((entry_id, lines))
+
+    async def next_frame(self, after: str, max_entries: int) -> dict:
+        # Espera el primer lote y agrupa los que ya estén en cola en un único frame,
+        # saltando lo que el cliente ya recibió en el replay (id <= after)
+        entries = [await self.queue.get()]
+        while len(entries) < max_entries and not self.queue.empty():
+            entries.append(self.queue.get_nowait())
+        last = parse_id(after)
+        entry_id, out = after, []
+        for eid, lines in entries:
+            if parse_id(eid) > last:
+                entry_id = eid
+                out.extend(lines)
+        frame = {"id": entry_id, "lines": out}
+        if self.dropped:
+            frame["dropped"] = self.dropped
+            self.dropped = 0
+        return frame
+
+class FeedClient:
+    """Cola acotada de cambios de un WebSocket. Los cambios no se pueden descartar sin perder estado:
+    si la cola se llena se vacía y el siguiente frame pide al cliente que vuelva a cargar los listados."""
+
+    def __init__(self, maxsize: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.resync = False
+
+    def push(self, msg: dict) -> None:
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.resync = True
+        self.queue.put_nowait(msg)
+
+    async def next_frame(self, max_entries: int) -> dict:
+        msgs = [await self.queue.get()]
+        while len(msgs) < max_entries and not self.queue.empty():
+            msgs.append(self.queue.get_nowait())
+        if self.resync:
+            self.resync = False
+            return {"resync": True}
+        return {"changes": msgs}
+
+class LogHub:
+    """Un único suscriptor Redis por proceso (PSUBSCRIBE scan:*:logs y SUBSCRIBE del feed de cambios)
+    que reparte a los clientes registrados."""
+
+    def __init__(self):
+        self.redis = aredis.from_url(settings.REDIS_URL, decode_responses=True)
+        self.clients: dict[int, set[LogClient]] = {}
+        self.feed_clients: set[FeedClient] = set()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def client_count(self) -> int:
+        return sum(len(c) for c in self.clients.values())
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        await self.redis.aclose()
+
+    def register(self, scan_id: int) -> LogClient:
+        self.start()
+        client = LogClient(scan_id, settings.LOG_CLIENT_QUEUE)
+        self.clients.setdefault(scan_id, set()).add(client)
+        return client
+
+    def unregister(self, client: LogClient) -> None:
+        group = self.clients.get(client.scan_id)
+        if group:
+            group.discard(client)
+            if not group:
+                self.clients.pop(client.scan_id, None)
+
+    def register_feed(self) -> FeedClient:
+        self.start()
+        client = FeedClient(settings.LOG_CLIENT_QUEUE)
+        self.feed_clients.add(client)
+        return client
+
+    def unregister_feed(self, client: FeedClient) -> None:
+        self.feed_clients.discard(client)
+
+    def _dispatch_feed(self, data: str) -> None:
+        if not self.feed_clients:
+            return
+        msg = json.loads(data)
+        for client in list(self.feed_clients):
+            client.push(msg)
+
+    def _dispatch(self, chan: str, data: str) -> None:
+        try:
+            scan_id = int(chan.split(":")[1])
+        except (IndexError, ValueError):
+            return
+        group = self.clients.get(scan_id)
+        if not group:
+            return
+        msg = json.loads(data)
+        lines = msg.get("lines", "").split("\n")
+        for client in list(group):
+            client.push(msg["id"], lines)
+
+    async def _run(self) -> None:
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.psubscribe("scan:*:logs")
+                await pubsub.subscribe(FEED_CHANNEL)
+                async for msg in pubsub.listen():
+                    try:
+                        if msg.get("type") == "pmessage":
+                            self._dispatch(msg["channel"], msg["data"])
+                        elif msg.get("type") == "message" and msg["channel"] == FEED_CHANNEL:
+                            self._dispatch_feed(msg["data"])
+                    except Exception:
+                        pass
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Redis caído o conexión cortada: reintentar sin tumbar el proceso; los clientes
+                # del feed pueden haber perdido cambios y deben recargar
+                for client in list(self.feed_clients):
+                    client.resync = True
+                    client.push({})
+                await asyncio.sleep(1.0)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+    async def backlog(self, scan_id: int, after: str) -> list[tuple[str, list[str]]]:
+        return await read_backlog(self.redis, scan_id, after)
+
+hub = LogHub()
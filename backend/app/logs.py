@@ -0,0 +1,114 @@
+# Módulo: logs de scan por lotes sobre Redis Streams
+import threading
+import time
+import redis as redislib
+from .config import settings
+from .metrics import LOG_LINES, REDIS_PUBLISH
+
+r = redislib.from_url(settings.REDIS_URL, decode_responses=True)
+
+def stream_key(scan_id: int) -> str:
+    return f"scan:{scan_id}:logstream"
+
+def channel(scan_id: int) -> str:
+    return f"scan:{scan_id}:logs"
+
+# XADD (stream acotado, reproducible) + PUBLISH (tail en vivo) en un único viaje;
+# el mensaje publicado lleva el id de la entrada para que el WebSocket pueda deduplicar tras el replay
+_append_batch = r.register_script("""
+local id = redis.call('XADD', KEYS[1], 'MAXLEN', '~', ARGV[1], '*', 'lines', ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('PUBLISH', KEYS[2], cjson.encode({id = id, lines = ARGV[2]}))
+return id
+""")
+
+def parse_id(entry_id: str) -> tuple[int, int]:
+    ms, _, seq = entry_id.partition("-")
+    return int(ms or 0), int(seq or 0)
+
+class ScanLogger:
+    """Buffer de líneas de log de un scan.
+
+    Las líneas se escriben como una sola entrada del stream cada ``LOG_BATCH_SIZE``
+    líneas o ``LOG_FLUSH_SECONDS`` segundos, en lugar de un PUBLISH por línea.
+    """
+
+    def __init__(self, scan_id: int):
+        self.scan_id = scan_id
+        self._lines: list[str] = []
+        self._lock = threading.Lock()
+        self._first_at = 0.0
+        self.last_used = time.monotonic()
+
+    def log(self, line: str) -> None:
+        with self._lock:
+            if not self._lines:
+                self._first_at = time.monotonic()
+            self._lines.append(line)
+            self.last_used = time.monotonic()
+            full = len(self._lines) >= settings.LOG_BATCH_SIZE
+        if full:
+            self.flush()
+
+    def stale(self) -> bool:
+        return bool(self._lines) and time.monotonic() - self._first_at >= settings.LOG_FLUSH_SECONDS
+
+    def flush(self) -> None:
+        with self._lock:
+            lines, self._lines = self._lines, []
+        if not lines:
+            return
+        try:
+            _append_batch(
+                keys=[stream_key(self.scan_id), channel(self.scan_id)],
+                args=[settings.LOG_STREAM_MAXLEN, "\n".join(lines), settings.LOG_STREAM_TTL],
+            )
+            REDIS_PUBLISH.labels(kind="log").inc()
+            LOG_LINES.inc(len(lines))
+        except Exception:
+            pass
+
+# Un buffer por scan y proceso; un hilo vacía los que llevan más de LOG_FLUSH_SECONDS sin escribirse
+_loggers: dict[int, ScanLogger] = {}
+_loggers_lock = threading.Lock()
+_flusher: threading.Thread | None = None
+
+def _flush_stale() -> None:
+    while True:
+        time.sleep(settings.LOG_FLUSH_SECONDS)
+        now = time.monotonic()
+        with _loggers_lock:
+            pending = [lg for lg in _loggers.values() if lg.stale()]
+            # Liberar los buffers de scans que ya no escriben
+            for scan_id, lg in list(_loggers.items()):
+                if not lg._lines and now - lg.last_used > 300:
+                    del _loggers[scan_id]
+        for lg in pending:
+            lg.flush()
+
+def _logger(scan_id: int) -> ScanLogger:
+    global _flusher
+    with _loggers_lock:
+        lg = _loggers.get(scan_id)
+        if lg is None:
+            lg = _loggers[scan_id] = ScanLogger(scan_id)
+        if _flusher is None or not _flusher.is_alive():
+            _flusher = threading.Thread(target=_flush_stale, name="scan-log-flusher", daemon=True)
+            _flusher.start()
+    return lg
+
+def scan_log(scan_id: int | None, line: str) -> None:
+    if scan_id:
+        _logger(scan_id).log(line)
+
+def flush_scan_log(scan_id: int) -> None:
+    with _loggers_lock:
+        lg = _loggers.get(scan_id)
+    if lg:
+        lg.flush()
+
+async def read_backlog(client, scan_id: int, after: str = "0", count: int = 500) -> list[tuple[str, list[str]]]:
+    """Entradas del stream posteriores a ``after`` (id exclusivo; "0" = desde el principio), con un cliente redis.asyncio."""
+    start = "-" if after in ("", "0", "0-0") else f"({after}"
+    entries = await client.xrange(stream_key(scan_id), min=start, max="+", count=count)
+    return [(entry_id, fields.get("lines", "").split("\n")) for entry_id, fields in entries]
@@ -1,20 +1,32 @@
 # Módulo: imports
-from fastapi import FastAPI, Depends, HTTPException, WebSocket
+from fastapi import FastAPI, Depends, HTTPException, WebSocket, Request, Response, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-from .db import Base, engine, get_db
-from .models import Client, Project, Scan, Finding
-from .schemas import ClientCreate, ClientOut, ProjectCreate, ProjectOut, ScanCreate, ScanOut, FindingOut
-from .tasks import run_scan
-from .exports import export_csv, export_pdf
+from .db import Base, engine, async_engine, AsyncSessionLocal, get_db, get_async_db, ensure_schema
+from .models import Client, Project, Scan, Finding, ScanDelta, ScanDiff, Asset
+from .schemas import ClientCreate, ClientOut, ProjectCreate, ProjectOut, ScanCreate, BulkScanCreate, ScanOut, ScanProgress, FindingOut, FindingPage, FindingCounts, DashboardSummary, ScanDiffOut, AssetPage, JobRef, JobOut
+from .tasks import run_scan, enqueue_scan, enqueue_report, enqueue_purge
+from .purge import soft_delete_project, soft_delete_scan, read_job
+from .exports import iter_csv, iter_ndjson, gzip_stream, report_path, report_version
 from .celery_app import celery
 from .config import settings
+from .loghub import hub as log_hub
+from .cache import tool_cache
+from .metrics import EXPORT_SECONDS, WS_CLIENTS, timed_iter, latest as latest_metrics
+from .plugins.runner import procs_key
+from . import summary, changes
+from .serialize import columns_for, row_dicts, json_response, stream_json_array
 import redis as redislib
+import hashlib
+import json
+import os
+import time
 from datetime import datetime, timedelta
 from fastapi import WebSocket
 import asyncio
-from sqlalchemy import text
+from sqlalchemy import text, func, select
 from pydantic import BaseModel, Field
 
 app = FastAPI(title="OSINT Dashboard API", version="0.1.0")
@@ -27,9 +39,29 @@ app.add_middleware(
 
 r = redislib.from_url(settings.REDIS_URL, decode_responses=True)
 
+# Proyectos y scans con deleted_at están pendientes de purga: para la API ya no existen
+def _live_scan(db: Session, scan_id: int) -> Scan | None:
+    s = db.get(Scan, scan_id)
+    return s if s is not None and s.deleted_at is None else None
+
+async def _ensure_live_scan(db: AsyncSession, scan_id: int) -> None:
+    if await db.scalar(select(Scan.id).where(Scan.id == scan_id, Scan.deleted_at.is_(None))) is None:
+        raise HTTPException(404, "Scan no encontrado")
+
+def _live_project(db: Session, project_id: int) -> Project | None:
+    p = db.get(Project, project_id)
+    return p if p is not None and p.deleted_at is None else None
+
+# Claves foráneas con ON DELETE CASCADE en bases PostgreSQL creadas antes de declararlas en los modelos
+_CASCADE_FKS = (
+    ("findings", "findings_scan_id_fkey", "scan_id", "scans"),
+    ("scans", "scans_project_id_fkey", "project_id", "projects"),
+    ("schedules", "schedules_project_id_fkey", "project_id", "projects"),
+)
+
 @app.on_event("startup")
 def on_startup():
-    Base.metadata.create_all(bind=engine)
+    ensure_schema()
     try:
         with engine.connect() as conn:
             conn.execute(text("CREATE INDEX IF NOT EXISTS idx_scans_project_id ON scans (project_id)"))
@@ -37,11 +69,36 @@ def on_startup():
             conn.execute(text("CREATE INDEX IF NOT EXISTS idx_schedules_next_run_at ON schedules (next_run_at)"))
     except Exception:
         pass
+    if engine.dialect.name == "postgresql":
+        for table, name, col, ref in _CASCADE_FKS:
+            try:
+                with engine.begin() as conn:
+                    rule = conn.execute(text(
+                        "SELECT confdeltype FROM pg_constraint WHERE conname = :name"), {"name": name}).scalar()
+                    if rule != "c":
+                        conn.execute(text(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {name}, "
+                                          f"ADD CONSTRAINT {name} FOREIGN KEY ({col}) REFERENCES {ref}(id) ON DELETE CASCADE"))
+            except Exception:
+                pass
+
+@app.on_event("startup")
+async def start_log_hub():
+    log_hub.start()
+
+@app.on_event("shutdown")
+async def stop_log_hub():
+    await log_hub.stop()
+    await async_engine.dispose()
 
 @app.get("/health")
 def health():
     return {"status": "ok"}
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    body, content_type = latest_metrics()
+    return Response(body, media_type=content_type)
+
 # Clientes
 @app.post("/api/clients", response_model=ClientOut)
 def create_client(body: ClientCreate, db: Session = Depends(get_db)):
@@ -62,27 +119,47 @@ def create_project(body: ProjectCreate, db: Session = Depends(get_db)):
 
 @app.get("/api/projects", response_model=List[ProjectOut])
 def list_projects(db: Session = Depends(get_db)):
-    return db.query(Project).all()
+    return db.query(Project).filter(Project.deleted_at.is_(None)).all()
 
-@app.delete("/api/projects/{project_id}")
+@app.delete("/api/projects/{project_id}", status_code=202, response_model=JobRef)
 def delete_project(project_id: int, db: Session = Depends(get_db)):
-    p = db.query(Project).get(project_id)
+    # Borrado lógico inmediato; las filas (scans, hallazgos, assets) las elimina un job en segundo plano
+    p = _live_project(db, project_id)
     if not p: raise HTTPException(404, "Proyecto no encontrado")
-    for s in db.query(Scan).filter(Scan.project_id==project_id).all():
-        db.delete(s)
-    db.delete(p)
-    db.commit()
-    return {"ok": True}
+    soft_delete_project(db, p)
+    return {"job_id": enqueue_purge("project", project_id)}
+
+@app.get("/api/projects/{project_id}/assets", response_model=AssetPage)
+def list_assets(
+    project_id: int,
+    category: str | None = None,
+    prefix: str | None = None,
+    cursor: int | None = None,
+    limit: int = 200,
+    db: Session = Depends(get_db)
+):
+    # Inventario deduplicado: escala con los activos únicos, no con hallazgos x scans
+    limit = max(1, min(limit, 1000))
+    q = db.query(Asset).filter(Asset.project_id == project_id)
+    if category:
+        q = q.filter(Asset.category == category)
+    if prefix:
+        escaped = prefix.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        q = q.filter(Asset.value.like(f"{escaped}%", escape="\\"))
+    if cursor is not None:
+        q = q.filter(Asset.id > cursor)
+    items = q.order_by(Asset.id).limit(limit + 1).all()
+    return {"items": items[:limit], "next_cursor": items[limit - 1].id if len(items) > limit else None}
 
 # Scans
 @app.post("/api/scans", response_model=ScanOut)
 def create_scan(body: ScanCreate, db: Session = Depends(get_db)):
-    p = db.query(Project).get(body.project_id)
+    p = _live_project(db, body.project_id)
     if not p:
         raise HTTPException(400, "Debe seleccionar un proyecto válido")
     s = Scan(project_id=body.project_id, target=body.target, tools=body.tools, status="pending")
     db.add(s); db.commit(); db.refresh(s)
-    async_res = run_scan.delay(s.id, body.target, body.tools)
+    async_res = run_scan.delay(s.id, body.target, body.tools, body.force_refresh)
     try:
         r.set(f"scan:{s.id}:task", async_res.id)
         s.status = "queued"
@@ -91,149 +168,403 @@ def create_scan(body: ScanCreate, db: Session = Depends(get_db)):
         pass
     return s
 
+def _normalize_targets(raw: List[str]) -> List[str]:
+    # Sin vacíos ni duplicados, conservando el orden de entrada
+    targets = list(dict.fromkeys(t.strip() for t in raw if t and t.strip()))
+    if not targets:
+        raise HTTPException(400, "La lista de objetivos está vacía")
+    if len(targets) > settings.BULK_MAX_TARGETS:
+        raise HTTPException(400, f"Máximo {settings.BULK_MAX_TARGETS} objetivos por escaneo masivo")
+    return targets
+
+def _create_bulk_scan(db: Session, project_id: int, targets: List[str], tools: List[str], force_refresh: bool) -> Scan:
+    p = _live_project(db, project_id)
+    if not p:
+        raise HTTPException(400, "Debe seleccionar un proyecto válido")
+    targets = _normalize_targets(targets)
+    # Etiqueta estable por lista: repetir la misma lista permite calcular el diff contra la anterior
+    digest = hashlib.sha1("\n".join(sorted(targets)).encode()).hexdigest()[:12]
+    s = Scan(project_id=project_id, target=f"bulk:{digest} ({len(targets)})", tools=tools, status="pending",
+             kind="bulk", targets=targets, target_count=len(targets))
+    db.add(s); db.commit(); db.refresh(s)
+    async_res = enqueue_scan(s, force_refresh)
+    try:
+        r.set(f"scan:{s.id}:task", async_res.id)
+        s.status = "queued"
+        db.commit(); db.refresh(s)
+    except Exception:
+        pass
+    return s
+
+@app.post("/api/scans/bulk", response_model=ScanOut)
+def create_bulk_scan(body: BulkScanCreate, db: Session = Depends(get_db)):
+    return _create_bulk_scan(db, body.project_id, body.targets, body.tools, body.force_refresh)
+
+@app.post("/api/scans/bulk/upload", response_model=ScanOut)
+def upload_bulk_scan(
+    project_id: int = Form(...),
+    tools: str = Form(""),
+    force_refresh: bool = Form(False),
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db)
+):
+    # Un objetivo por línea; en CSV se toma la primera columna. Endpoint síncrono (threadpool): el commit,
+    # el encolado de objetivos en Redis y la publicación en Celery no bloquean el event loop
+    content = file.file.read().decode("utf-8", errors="ignore")
+    targets = [line.split(",")[0].strip().strip('"') for line in content.splitlines() if not line.startswith("#")]
+    tool_ids = [t.strip() for t in tools.split(",") if t.strip()]
+    return _create_bulk_scan(db, project_id, targets, tool_ids, force_refresh)
+
+async def _not_modified(kind: str, request: Request) -> tuple[Response | None, dict]:
+    # ETag = versión del feed de cambios: si no ha cambiado nada se responde 304 sin tocar la BD
+    etag = await changes.etag(kind)
+    if not etag:
+        return None, {}
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers), headers
+    return None, headers
+
+# Los listados devuelven tuplas de columnas codificadas con orjson (ver app/serialize.py);
+# response_model se mantiene para la documentación OpenAPI
 @app.get("/api/scans", response_model=List[ScanOut])
-def list_scans(
+async def list_scans(
+    request: Request,
     project_id: int | None = None,
     limit: int = 100,
     offset: int = 0,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    q = db.query(Scan).order_by(Scan.id.desc())
+    cached, headers = await _not_modified("scans", request)
+    if cached:
+        return cached
+    q = select(*columns_for(Scan, ScanOut)).where(Scan.deleted_at.is_(None)).order_by(Scan.id.desc())
     if project_id is not None:
-        q = q.filter(Scan.project_id == project_id)
+        q = q.where(Scan.project_id == project_id)
     q = q.offset(offset).limit(max(1, min(limit, 500)))
-    return q.all()
+    return json_response(row_dicts(ScanOut, await db.execute(q)), headers)
+
+@app.get("/api/summary", response_model=DashboardSummary)
+def get_summary(project_id: int | None = None, db: Session = Depends(get_db)):
+    # Contadores mantenidos en la ingesta y en los cambios de estado: no recorre scans ni findings
+    return summary.read(db, project_id)
 
 @app.get("/api/scans/{scan_id}", response_model=ScanOut)
 def get_scan(scan_id: int, db: Session = Depends(get_db)):
-    s = db.query(Scan).get(scan_id)
+    s = _live_scan(db, scan_id)
     if not s: raise HTTPException(404, "Scan no encontrado")
     return s
 
+@app.get("/api/scans/{scan_id}/progress", response_model=ScanProgress)
+def get_scan_progress(scan_id: int, db: Session = Depends(get_db)):
+    # Progreso agregado del scan padre: contadores en Redis que actualizan los carriles
+    s = _live_scan(db, scan_id)
+    if not s: raise HTTPException(404, "Scan no encontrado")
+    try:
+        p = r.hgetall(f"scan:{scan_id}:progress")
+    except Exception:
+        p = {}
+    total = int(p.get("total") or s.target_count or 1)
+    finished = s.status in ("completed", "stopped", "error")
+    if p:
+        done, findings, errors = int(p.get("done", 0)), int(p.get("findings", 0)), int(p.get("errors", 0))
+    else:
+        # Scans simples o progreso expirado: se deriva del estado y de la BD
+        findings = db.query(func.count(Finding.id)).filter(Finding.scan_id == scan_id).scalar() or 0
+        done, errors = (total if finished else 0), 0
+    eta = None
+    if p and s.status == "running" and 0 < done < total:
+        elapsed = time.time() - float(p.get("started_at") or time.time())
+        eta = int(elapsed / done * (total - done))
+    return {"scan_id": scan_id, "status": s.status, "total": total, "done": done,
+            "findings": findings, "errors": errors, "eta_seconds": eta}
 
-@app.get("/api/scans/{scan_id}/findings", response_model=List[FindingOut])
-def get_findings(scan_id: int, db: Session = Depends(get_db)):
-    return db.query(Finding).filter(Finding.scan_id==scan_id).all()
+def _findings_filters(scan_id: int, tool: str | None, category: str | None, severity: str | None, prefix: str | None) -> list:
+    conds = [Finding.scan_id == scan_id]
+    if tool:
+        conds.append(Finding.tool == tool)
+    if category:
+        conds.append(Finding.category == category)
+    if severity:
+        conds.append(Finding.severity == severity)
+    if prefix:
+        escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        conds.append(Finding.value.like(f"{escaped}%", escape="\\"))
+    return conds
+
+@app.get("/api/scans/{scan_id}/findings", response_model=FindingPage)
+async def get_findings(
+    scan_id: int,
+    cursor: int | None = None,
+    limit: int = 200,
+    tool: str | None = None,
+    category: str | None = None,
+    severity: str | None = None,
+    prefix: str | None = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Paginación keyset sobre (scan_id, id): `cursor` es el último id recibido
+    await _ensure_live_scan(db, scan_id)
+    limit = max(1, min(limit, 1000))
+    q = select(*columns_for(Finding, FindingOut)).where(*_findings_filters(scan_id, tool, category, severity, prefix))
+    if cursor is not None:
+        q = q.where(Finding.id > cursor)
+    items = row_dicts(FindingOut, await db.execute(q.order_by(Finding.id).limit(limit + 1)))
+    next_cursor = items[limit - 1]["id"] if len(items) > limit else None
+    return json_response({"items": items[:limit], "next_cursor": next_cursor})
+
+@app.get("/api/scans/{scan_id}/findings/count", response_model=FindingCounts)
+async def count_findings(
+    scan_id: int,
+    tool: str | None = None,
+    category: str | None = None,
+    severity: str | None = None,
+    prefix: str | None = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Totales por faceta con GROUP BY sobre los índices compuestos
+    await _ensure_live_scan(db, scan_id)
+    conds = _findings_filters(scan_id, tool, category, severity, prefix)
+    out = {"total": 0}
+    for facet in ("tool", "category", "severity"):
+        col = getattr(Finding, facet)
+        rows = await db.execute(select(col, func.count(Finding.id)).where(*conds).group_by(col))
+        out[facet] = {k: n for k, n in rows}
+    out["total"] = sum(out["category"].values())
+    return out
+
+@app.get("/api/scans/{scan_id}/diff", response_model=ScanDiffOut)
+def get_scan_diff(
+    scan_id: int,
+    change: str | None = None,
+    cursor: int | None = None,
+    limit: int = 200,
+    db: Session = Depends(get_db)
+):
+    # Diff precalculado en la ingesta: se lee solo el delta (new/gone), nunca las dos listas completas
+    s = _live_scan(db, scan_id)
+    if not s: raise HTTPException(404, "Scan no encontrado")
+    if change not in (None, "new", "gone"):
+        raise HTTPException(400, "change debe ser 'new' o 'gone'")
+    limit = max(1, min(limit, 1000))
+    q = db.query(ScanDelta).filter(ScanDelta.scan_id == scan_id)
+    if change:
+        q = q.filter(ScanDelta.change == change)
+    if cursor is not None:
+        q = q.filter(ScanDelta.id > cursor)
+    items = q.order_by(ScanDelta.id).limit(limit + 1).all()
+    diff_row = db.get(ScanDiff, scan_id)
+    if diff_row:
+        new, gone, persisted = diff_row.new_count, diff_row.gone_count, diff_row.persisted_count
+    else:
+        # Scan en curso: los nuevos se van registrando; desaparecidos y persistentes al finalizar
+        new = db.query(ScanDelta).filter(ScanDelta.scan_id == scan_id, ScanDelta.change == "new").count()
+        gone, persisted = 0, None
+    return {
+        "scan_id": scan_id,
+        "base_scan_id": s.base_scan_id,
+        "new": new,
+        "gone": gone,
+        "persisted": persisted,
+        "items": items[:limit],
+        "next_cursor": items[limit - 1].id if len(items) > limit else None,
+    }
+
+@app.get("/api/cache/stats")
+def cache_stats():
+    # Aciertos/fallos por herramienta y entradas vivas de la caché de resultados
+    return tool_cache.stats()
+
+@app.get("/api/scans/{scan_id}/tools")
+def get_scan_tools(scan_id: int):
+    # Estado por herramienta (queued/running/completed/stopped/error)
+    try:
+        return r.hgetall(f"scan:{scan_id}:tools")
+    except Exception:
+        return {}
 
 @app.post("/api/scans/{scan_id}/start", response_model=ScanOut)
-def start_scan(scan_id: int, db: Session = Depends(get_db)):
-    s = db.query(Scan).get(scan_id)
+def start_scan(scan_id: int, force_refresh: bool = False, db: Session = Depends(get_db)):
+    s = _live_scan(db, scan_id)
     if not s: raise HTTPException(404, "Scan no encontrado")
     if s.status in ("running", "queued"):
         raise HTTPException(400, "El scan ya está en curso")
-    async_res = run_scan.delay(s.id, s.target, s.tools)
+    async_res = enqueue_scan(s, force_refresh)
     r.set(f"scan:{s.id}:task", async_res.id)
     s.status = "queued"
     db.commit(); db.refresh(s)
     return s
 
-@app.post("/api/scans/{scan_id}/stop", response_model=ScanOut)
-def stop_scan(scan_id: int, db: Session = Depends(get_db)):
-    s = db.query(Scan).get(scan_id)
-    if not s: raise HTTPException(404, "Scan no encontrado")
-
+def _request_stop(scan_id: int) -> None:
     try:
-        r.set(f"scan:{s.id}:stop", "1", ex=3600)
+        r.set(f"scan:{scan_id}:stop", "1", ex=3600)
     except Exception:
         pass
 
-    task_id = r.get(f"scan:{s.id}:task")
-    if not task_id:
-        try:
-            i = celery.control.inspect()
-            active = i.active() or {}
-            reserved = i.reserved() or {}
-            def find_task_id(buckets):
-                for _, tasks in buckets.items():
-                    for t in tasks:
-                        if t.get("name") == "app.tasks.run_scan":
-                            args = str(t.get("args"))
-                            if f"({scan_id}," in args or f"{scan_id}" in args:
-                                return t.get("id")
-                return None
-            task_id = find_task_id(active) or find_task_id(reserved)
-        except Exception:
-            task_id = None
-
+    # Los subprocesos los mata su propio worker: el token de cancelación ve la bandera y hace killpg.
+    # Aquí solo se revocan (sin broadcast de inspect ni terminate) las tareas conocidas por el registro
+    # del scan, para que las que aún estén en cola no lleguen a arrancar.
     try:
-        if task_id:
-            celery.control.revoke(task_id, terminate=True, signal="SIGTERM")
-            r.delete(f"scan:{s.id}:task")
+        task_ids = {r.get(f"scan:{scan_id}:task")}
+        task_ids.update(json.loads(v).get("task") for v in r.hvals(procs_key(scan_id)))
+        task_ids.discard(None)
+        if task_ids:
+            celery.control.revoke(list(task_ids))
+        r.delete(f"scan:{scan_id}:task")
     except Exception:
         pass
 
+@app.post("/api/scans/{scan_id}/stop", response_model=ScanOut)
+def stop_scan(scan_id: int, db: Session = Depends(get_db)):
+    s = _live_scan(db, scan_id)
+    if not s: raise HTTPException(404, "Scan no encontrado")
+
+    _request_stop(s.id)
     s.status = "stopped"
     s.finished_at = datetime.utcnow()
     db.commit(); db.refresh(s)
     return s
 
 @app.websocket("/ws/scans/{scan_id}/logs")
-async def ws_scan_logs(websocket: WebSocket, scan_id: int):
+async def ws_scan_logs(websocket: WebSocket, scan_id: int, offset: str = "0"):
+    # Replay del stream desde `offset` y luego tail en vivo vía el hub; cada frame es {"id", "lines"}
+    async with AsyncSessionLocal() as db:
+        live = await db.scalar(select(Scan.id).where(Scan.id == scan_id, Scan.deleted_at.is_(None)))
+    if live is None:
+        await websocket.close(code=1008)
+        return
     await websocket.accept()
-    pubsub = r.pubsub()
-    pubsub.subscribe(f"scan:{scan_id}:logs")
+    # Registrar antes del replay para no perder lo publicado entre ambos pasos
+    client = log_hub.register(scan_id)
+    WS_CLIENTS.labels(endpoint="logs").inc()
+
+    async def wait_disconnect():
+        while True:
+            msg = await websocket.receive()
+            if msg.get("type") == "websocket.disconnect":
+                return
+
+    watcher = asyncio.create_task(wait_disconnect())
     try:
+        last = offset or "0"
         while True:
-            msg = pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
-            if msg and msg.get("type") == "message":
-                await websocket.send_text(str(msg.get("data")))
-            await asyncio.sleep(0.2)
+            batch = await log_hub.backlog(scan_id, last)
+            if batch:
+                last = batch[-1][0]
+                await websocket.send_text(json.dumps({"id": last, "lines": [ln for _, lines in batch for ln in lines]}))
+            if len(batch) < 500:
+                break
+        while True:
+            frame_task = asyncio.ensure_future(client.next_frame(last, settings.LOG_FRAME_MAX_ENTRIES))
+            done, _ = await asyncio.wait({frame_task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+            if watcher in done:
+                frame_task.cancel()
+                break
+            frame = frame_task.result()
+            if not frame["lines"] and "dropped" not in frame:
+                continue
+            last = frame["id"]
+            await websocket.send_text(json.dumps(frame))
     except Exception:
         pass
     finally:
+        log_hub.unregister(client)
+        WS_CLIENTS.labels(endpoint="logs").dec()
+        watcher.cancel()
         try:
-            pubsub.close()
+            await websocket.close()
+        except RuntimeError:
+            pass
         except Exception:
             pass
+
+@app.websocket("/ws/changes")
+async def ws_changes(websocket: WebSocket):
+    # Feed de cambios: {"versions"} al conectar y luego frames {"changes": [...]} o {"resync": true}
+    await websocket.accept()
+    client = log_hub.register_feed()
+    WS_CLIENTS.labels(endpoint="changes").inc()
+
+    async def wait_disconnect():
+        while True:
+            msg = await websocket.receive()
+            if msg.get("type") == "websocket.disconnect":
+                return
+
+    watcher = asyncio.create_task(wait_disconnect())
+    try:
+        versions = {kind: await changes.aversion(kind) for kind in changes.KINDS}
+        await websocket.send_text(json.dumps({"versions": versions}))
+        while True:
+            frame_task = asyncio.ensure_future(client.next_frame(settings.LOG_FRAME_MAX_ENTRIES))
+            done, _ = await asyncio.wait({frame_task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+            if watcher in done:
+                frame_task.cancel()
+                break
+            await websocket.send_text(json.dumps(frame_task.result()))
+    except Exception:
+        pass
+    finally:
+        log_hub.unregister_feed(client)
+        WS_CLIENTS.labels(endpoint="changes").dec()
+        watcher.cancel()
         try:
             await websocket.close()
-        except RuntimeError:
-            pass
         except Exception:
             pass
 
 # Exportaciones
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, FileResponse, JSONResponse, Response
 
-@app.get("/api/exports/{scan_id}.csv")
-def export_scan_csv(scan_id: int, db: Session = Depends(get_db)):
-    data = export_csv(db, scan_id)
-    return StreamingResponse(io.BytesIO(data), media_type="text/csv", headers={
-        "Content-Disposition": f'attachment; filename="scan_{scan_id}.csv"'
+def _export_response(db: Session, scan_id: int, chunks, media_type: str, filename: str, gzip: bool):
+    if not db.query(Scan.id).filter(Scan.id == scan_id, Scan.deleted_at.is_(None)).first():
+        raise HTTPException(404, "Scan no encontrado")
+    chunks = timed_iter(chunks, EXPORT_SECONDS, format=filename.rsplit(".", 1)[-1])
+    if gzip:
+        chunks, media_type, filename = gzip_stream(chunks), "application/gzip", f"{filename}.gz"
+    return StreamingResponse(chunks, media_type=media_type, headers={
+        "Content-Disposition": f'attachment; filename="{filename}"'
     })
 
-import io
+@app.get("/api/exports/{scan_id}.csv")
+def export_scan_csv(scan_id: int, gzip: bool = False, db: Session = Depends(get_db)):
+    return _export_response(db, scan_id, iter_csv(scan_id), "text/csv", f"scan_{scan_id}.csv", gzip)
+
+@app.get("/api/exports/{scan_id}.ndjson")
+def export_scan_ndjson(scan_id: int, gzip: bool = False, db: Session = Depends(get_db)):
+    return _export_response(db, scan_id, iter_ndjson(scan_id), "application/x-ndjson", f"scan_{scan_id}.ndjson", gzip)
+
 @app.get("/api/exports/{scan_id}.pdf")
-def export_scan_pdf(scan_id: int, db: Session = Depends(get_db)):
-    data = export_pdf(db, scan_id)
-    return StreamingResponse(io.BytesIO(data), media_type="application/pdf", headers={
-        "Content-Disposition": f'attachment; filename="scan_{scan_id}.pdf"'
-    })
-@app.delete("/api/scans/{scan_id}", status_code=204)
+def export_scan_pdf(scan_id: int, request: Request, db: Session = Depends(get_db)):
+    # El PDF lo genera un worker; aquí solo se sirve el artefacto cacheado o se encola su render
+    s = _live_scan(db, scan_id)
+    if not s: raise HTTPException(404, "Scan no encontrado")
+    version = report_version(db, s)
+    etag = f'"{version}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    path = report_path(scan_id, version)
+    if os.path.exists(path):
+        return FileResponse(path, media_type="application/pdf", filename=f"scan_{scan_id}.pdf", headers=headers)
+    enqueue_report(scan_id, version)
+    return JSONResponse({"status": "rendering", "version": version}, status_code=202, headers={"Retry-After": "5"})
+
+@app.delete("/api/scans/{scan_id}", status_code=202, response_model=JobRef)
 def delete_scan(scan_id: int, db: Session = Depends(get_db)):
-    s = db.query(Scan).get(scan_id)
+    s = _live_scan(db, scan_id)
     if not s:
         raise HTTPException(404, "Scan no encontrado")
-    try:
-        r.setex(f"scan:{scan_id}:stop", 600, "1")
-    except Exception:
-        pass
-    try:
-        task_id = r.get(f"scan:{scan_id}:task")
-        if task_id:
-            try:
-                celery.control.revoke(task_id, terminate=True, signal="SIGTERM")
-            except Exception:
-                pass
-            try:
-                r.delete(f"scan:{scan_id}:task")
-            except Exception:
-                pass
-    except Exception:
-        pass
-    db.delete(s)
-    db.commit()
-    return None
+    # Misma parada que /stop: el estado lo cierra finalize_scan y la purga espera a que termine
+    _request_stop(scan_id)
+    soft_delete_scan(db, s)
+    return {"job_id": enqueue_purge("scan", scan_id)}
+
+@app.get("/api/jobs/{job_id}", response_model=JobOut)
+def get_job(job_id: str):
+    job = read_job(job_id)
+    if not job: raise HTTPException(404, "Job no encontrado")
+    return job
 
 # Schedules (programaciones)
 from .models import Schedule
@@ -241,7 +572,7 @@ from .schemas import ScheduleCreate, ScheduleOut
 
 @app.post("/api/schedules", response_model=ScheduleOut)
 def create_schedule(body: ScheduleCreate, db: Session = Depends(get_db)):
-    p = db.query(Project).get(body.project_id)
+    p = _live_project(db, body.project_id)
     if not p:
         raise HTTPException(400, "Debe seleccionar un proyecto válido")
     s = Schedule(
@@ -256,8 +587,12 @@ def create_schedule(body: ScheduleCreate, db: Session = Depends(get_db)):
     return s
 
 @app.get("/api/schedules", response_model=List[ScheduleOut])
-def list_schedules(db: Session = Depends(get_db)):
-    return db.query(Schedule).order_by(Schedule.id.desc()).all()
+async def list_schedules(request: Request):
+    # Sin límite de filas: array JSON en streaming por particiones
+    cached, headers = await _not_modified("schedules", request)
+    if cached:
+        return cached
+    return stream_json_array(ScheduleOut, select(*columns_for(Schedule, ScheduleOut)).order_by(Schedule.id.desc()), headers)
 
 class SchedulePatch(BaseModel):
     enabled: bool | None = None
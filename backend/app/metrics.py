@@ -0,0 +1,103 @@
+# Módulo: métricas Prometheus de API y workers
+# La API las expone en /metrics; cada worker Celery levanta su propio exporter HTTP (METRICS_PORT).
+# Con PROMETHEUS_MULTIPROC_DIR definido (workers prefork) los procesos hijos escriben en ficheros
+# compartidos y el exporter del proceso principal los agrega.
+import os
+import time
+from contextlib import contextmanager
+from prometheus_client import (CollectorRegistry, Counter, Gauge, Histogram, REGISTRY,
+                               generate_latest, start_http_server, CONTENT_TYPE_LATEST)
+from prometheus_client import multiprocess
+from celery import signals
+from .config import settings
+
+if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+_DURATION_BUCKETS = (0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+_FAST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+TOOL_RUN_SECONDS = Histogram("osint_tool_run_seconds", "Duración de una ejecución de herramienta sobre un objetivo",
+                             ["tool", "source", "status"], buckets=_DURATION_BUCKETS)
+TOOL_LINES = Counter("osint_tool_output_lines_total", "Líneas de salida leídas de binarios externos", ["binary"])
+FINDINGS = Counter("osint_findings_ingested_total", "Hallazgos persistidos", ["tool"])
+SAVE_FINDINGS_SECONDS = Histogram("osint_save_findings_seconds", "Latencia de un lote de save_findings",
+                                  ["method"], buckets=_FAST_BUCKETS)
+SAVE_FINDINGS_ROWS = Counter("osint_save_findings_rows_total", "Filas insertadas por save_findings", ["method"])
+TASK_SECONDS = Histogram("osint_task_seconds", "Duración de tareas Celery", ["task", "state"], buckets=_DURATION_BUCKETS)
+QUEUE_WAIT_SECONDS = Histogram("osint_task_queue_wait_seconds", "Espera en cola (encolado → inicio)", ["task", "queue"],
+                               buckets=_DURATION_BUCKETS)
+REDIS_PUBLISH = Counter("osint_redis_publish_total", "PUBLISH enviados a Redis", ["kind"])
+LOG_LINES = Counter("osint_log_lines_total", "Líneas de log de scan escritas")
+WS_CLIENTS = Gauge("osint_ws_clients", "Clientes WebSocket conectados (logs de scan o feed de cambios)", ["endpoint"],
+                   multiprocess_mode="livesum")
+EXPORT_SECONDS = Histogram("osint_export_seconds", "Duración de exportaciones y reportes", ["format"], buckets=_DURATION_BUCKETS)
+
+@contextmanager
+def timer(histogram, **labels):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.labels(**labels).observe(time.perf_counter() - t0)
+
+def timed_iter(iterable, histogram, **labels):
+    """Envuelve un generador (p.ej. una exportación en streaming) y observa su duración total."""
+    t0 = time.perf_counter()
+    try:
+        yield from iterable
+    finally:
+        histogram.labels(**labels).observe(time.perf_counter() - t0)
+
+def latest() -> tuple[bytes, str]:
+    registry = REGISTRY
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+# Hooks Celery: marca de encolado en las cabeceras, espera en cola y duración por tarea
+@signals.before_task_publish.connect
+def _stamp_enqueued(headers=None, **kwargs):
+    if headers is not None:
+        headers.setdefault("enqueued_at", time.time())
+
+_started: dict[str, float] = {}
+
+@signals.task_prerun.connect
+def _task_started(task_id=None, task=None, **kwargs):
+    _started[task_id] = time.perf_counter()
+    enqueued = getattr(task.request, "enqueued_at", None)
+    if enqueued:
+        queue = (task.request.delivery_info or {}).get("routing_key") or "default"
+        QUEUE_WAIT_SECONDS.labels(task=task.name, queue=queue).observe(max(0.0, time.time() - float(enqueued)))
+
+@signals.task_postrun.connect
+def _task_finished(task_id=None, task=None, state=None, **kwargs):
+    t0 = _started.pop(task_id, None)
+    if t0 is not None:
+        TASK_SECONDS.labels(task=task.name, state=state or "UNKNOWN").observe(time.perf_counter() - t0)
+
+@signals.worker_init.connect
+def _start_worker_exporter(**kwargs):
+    if settings.METRICS_PORT <= 0:
+        return
+    registry = REGISTRY
+    path = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if path:
+        # Ficheros de una ejecución anterior del worker falsearían los contadores
+        os.makedirs(path, exist_ok=True)
+        for name in os.listdir(path):
+            if not name.endswith(f"_{os.getpid()}.db"):
+                os.remove(os.path.join(path, name))
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    try:
+        start_http_server(settings.METRICS_PORT, registry=registry)
+    except OSError:
+        pass
+
+@signals.worker_process_shutdown.connect
+def _mark_dead(pid=None, **kwargs):
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid or os.getpid())
@@ -1,5 +1,5 @@
 # Módulo: imports + uso de Boolean
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, JSON, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, JSON, Boolean, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .db import Base
@@ -16,7 +16,12 @@ class Project(Base):
     name = Column(String(200), nullable=False)
     client_id = Column(Integer, ForeignKey("clients.id"))
     client = relationship("Client", back_populates="projects")
-    scans = relationship("Scan", back_populates="project")
+    # Borrado en dos fases: deleted_at lo oculta de inmediato y app.purge elimina las filas en segundo plano
+    deleted_at = Column(DateTime(timezone=True), nullable=True)
+    scans = relationship("Scan", back_populates="project", passive_deletes=True)
+
+# Estados de un scan con herramientas que aún pueden estar ingiriendo
+ACTIVE_STATUSES = ("pending", "queued", "running")
 
 class Scan(Base):
     __tablename__ = "scans"
@@ -26,14 +31,21 @@ class Scan(Base):
     tools = Column(JSON, default=[])
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     finished_at = Column(DateTime(timezone=True), nullable=True)
-    project_id = Column(Integer, ForeignKey("projects.id"))
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"))
     project = relationship("Project", back_populates="scans")
-    findings = relationship("Finding", back_populates="scan", cascade="all, delete-orphan")
+    # passive_deletes: el borrado de hallazgos lo hace la BD (ON DELETE CASCADE), sin cargarlos en memoria
+    findings = relationship("Finding", back_populates="scan", cascade="all, delete-orphan", passive_deletes=True)
+    schedule_id = Column(Integer, ForeignKey("schedules.id", ondelete="SET NULL"), nullable=True, index=True)
+    base_scan_id = Column(Integer, nullable=True)  # scan anterior con el que se calcula el diff
+    kind = Column(String(20), default="single")  # single | bulk
+    targets = Column(JSON, nullable=True)  # lista de objetivos de un scan masivo
+    target_count = Column(Integer, nullable=True)
+    deleted_at = Column(DateTime(timezone=True), nullable=True, index=True)
 
 class Finding(Base):
     __tablename__ = "findings"
     id = Column(Integer, primary_key=True, index=True)
-    scan_id = Column(Integer, ForeignKey("scans.id"), index=True)
+    scan_id = Column(Integer, ForeignKey("scans.id", ondelete="CASCADE"), index=True)
     tool = Column(String(100), nullable=False)
     category = Column(String(100), nullable=False)  # subdomain, host, email, leak, etc.
     value = Column(String(500), nullable=False)
@@ -42,14 +54,67 @@ class Finding(Base):
     raw = Column(Text, nullable=True)
     scan = relationship("Scan", back_populates="findings")
 
+    # Índices compuestos para la paginación keyset (scan_id, id) y los filtros por faceta / prefijo de valor
+    __table_args__ = (
+        Index("ix_findings_scan_id_id", "scan_id", "id"),
+        Index("ix_findings_scan_tool_id", "scan_id", "tool", "id"),
+        Index("ix_findings_scan_category_id", "scan_id", "category", "id"),
+        Index("ix_findings_scan_severity_id", "scan_id", "severity", "id"),
+        Index("ix_findings_scan_value", "scan_id", "value", postgresql_ops={"value": "text_pattern_ops"}),
+    )
+
 class Schedule(Base):
     __tablename__ = "schedules"
     id = Column(Integer, primary_key=True, index=True)
-    project_id = Column(Integer, ForeignKey("projects.id"), nullable=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=True)
     target = Column(String(255), nullable=False)
     tools = Column(JSON, default=[])
     interval_minutes = Column(Integer, nullable=False)  # cada N minutos
     enabled = Column(Boolean, default=True)
     next_run_at = Column(DateTime(timezone=True), nullable=False)
     last_run_at = Column(DateTime(timezone=True), nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class ScanDelta(Base):
+    # Cambios respecto al scan base: solo se guardan los hallazgos nuevos y los desaparecidos
+    __tablename__ = "scan_deltas"
+    id = Column(Integer, primary_key=True, index=True)
+    scan_id = Column(Integer, ForeignKey("scans.id", ondelete="CASCADE"), nullable=False)
+    base_scan_id = Column(Integer, nullable=True)
+    change = Column(String(10), nullable=False)  # new | gone
+    category = Column(String(100), nullable=False)
+    value = Column(String(500), nullable=False)  # valor normalizado
+    tool = Column(String(100), nullable=True)
+
+    __table_args__ = (
+        Index("ix_scan_deltas_scan_change_id", "scan_id", "change", "id"),
+    )
+
+class ScanDiff(Base):
+    __tablename__ = "scan_diffs"
+    scan_id = Column(Integer, ForeignKey("scans.id", ondelete="CASCADE"), primary_key=True)
+    base_scan_id = Column(Integer, nullable=True)
+    new_count = Column(Integer, default=0)
+    gone_count = Column(Integer, default=0)
+    persisted_count = Column(Integer, default=0)
+    computed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class Asset(Base):
+    # Inventario deduplicado por proyecto: una fila por (categoría, valor normalizado)
+    __tablename__ = "assets"
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+    category = Column(String(100), nullable=False)
+    value = Column(String(500), nullable=False)
+    first_seen = Column(DateTime(timezone=True), nullable=False)
+    last_seen = Column(DateTime(timezone=True), nullable=False)
+    seen_by_tools = Column(String(500), default="")  # ",amass,subfinder,"
+    scan_count = Column(Integer, default=1)
+    last_scan_id = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("project_id", "category", "value", name="uq_assets_project_category_value"),
+        Index("ix_assets_project_id_id", "project_id", "id"),
+        Index("ix_assets_project_category_id", "project_id", "category", "id"),
+    )
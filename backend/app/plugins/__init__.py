@@ -1,7 +1,12 @@
 from .base import TOOLS_REGISTRY, register_tool
 from .subfinder import SubfinderTool
 from .theharvester import TheHarvesterTool
+from .hibp import HIBPTool
+from .spiderfoot import SpiderfootTool
 
 # Registrar herramientas disponibles (puedes comentar las que no uses)
 register_tool(SubfinderTool())
-register_tool(TheHarvesterTool())
\ No newline at end of file
+register_tool(TheHarvesterTool())
+# Perfil "http": sin HIBP_API_KEY / SPIDERFOOT_URL no devuelven hallazgos
+register_tool(HIBPTool())
+register_tool(SpiderfootTool())
@@ -1,63 +1,43 @@
-import shutil, subprocess, json
-from typing import List, Dict, Any
+import shutil, json
+from typing import Iterator, Dict, Any
 from .base import OSINTTool
-from ..config import settings
-import redis as redislib
-
-r = redislib.from_url(settings.REDIS_URL, decode_responses=True)
+from .parsing import Normalizer
+from .runner import run_process
+from ..cancel import CancelToken
+from ..logs import scan_log
 
 class AmassTool(OSINTTool):
     id = "amass"
     name = "OWASP Amass"
     supported_targets = ["domain"]
+    cacheable = True
 
-    def run(self, target: str, scan_id: int | None = None) -> List[Dict[str, Any]]:
+    def iter_findings(self, target: str, scan_id: int | None = None, cancel: CancelToken | None = None) -> Iterator[Dict[str, Any]]:
         if not shutil.which("amass"):
-            return []
+            return
         cmd = ["amass", "enum", "-d", target, "-json", "-"]
+        norm = Normalizer(target)
         try:
-            p = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
-            findings: List[Dict[str, Any]] = []
-            while True:
-                line = p.stdout.readline()
-                if not line:
-                    break
+            # El runner aplica timeouts y límites y mata el grupo de procesos al parar el scan
+            for line in run_process(cmd, scan_id, cancel):
                 l = line.strip()
-                if scan_id:
-                    try:
-                        r.publish(f"scan:{scan_id}:logs", f"[amass] {l}")
-                    except Exception:
-                        pass
-                # parseo JSON y push a findings
+                scan_log(scan_id, f"[amass] {l}")
+                # parseo JSON y emisión de hallazgos
                 try:
                     obj = json.loads(l)
-                    name = obj.get("name")
+                    # Solo subdominios válidos, dentro del alcance y no repetidos
+                    name = norm.host(obj.get("name"))
                     if name:
-                        findings.append({
+                        yield {
                             "tool": self.id,
                             "category": "subdomain",
                             "value": name,
                             "severity": "info",
                             "meta": {"sources": obj.get("sources", []), "addresses": obj.get("addresses", [])},
                             "raw": obj,
-                        })
+                        }
                 except json.JSONDecodeError:
                     continue
-                if scan_id and r.get(f"scan:{scan_id}:stop") == "1":
-                    try:
-                        p.terminate()
-                    except Exception:
-                        pass
-                    break
-            try:
-                p.wait(timeout=5)
-            except Exception:
-                pass
-            return findings
         except Exception as e:
-            if scan_id:
-                try:
-                    r.publish(f"scan:{scan_id}:logs", f"[amass] error: {e}")
-                except Exception:
-                    pass
-            return [{"tool": self.id, "category": "error", "value": str(e), "severity": "info", "meta": {}, "raw": None}]
\ No newline at end of file
+            scan_log(scan_id, f"[amass] error: {e}")
+            yield {"tool": self.id, "category": "error", "value": str(e), "severity": "info", "meta": {}, "raw": None}
\ No newline at end of file
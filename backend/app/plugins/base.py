@@ -1,30 +1,32 @@
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Iterator, Tuple
+from ..cancel import CancelToken
 
 class OSINTTool:
     id: str
     name: str
     supported_targets: List[str]  # ["domain","ip","email"]
+    cacheable: bool = False  # resultados reutilizables entre scans (fuentes pasivas)
+    options: Dict[str, Any] = {}  # opciones que cambian la salida; forman parte de la clave de caché
+    profile: str = "subprocess"  # perfil de recursos: "subprocess" (binario externo) | "http" (API); decide la cola
 
-    def run(self, target: str, scan_id: int | None = None) -> List[Dict[str, Any]]:
+    def iter_findings(self, target: str, scan_id: int | None = None, cancel: CancelToken | None = None) -> Iterator[Dict[str, Any]]:
+        # Contrato de streaming: emitir cada hallazgo en cuanto se parsea, sin acumular la salida completa
         raise NotImplementedError
 
-TOOLS_REGISTRY: Dict[str, OSINTTool] = {}
-
-def register_tool(tool: OSINTTool):
-    TOOLS_REGISTRY[tool.id] = tool
-
-
-from typing import Dict, List, Any
+    batch: bool = False  # True si iter_batch agrupa los objetivos en una sola llamada (carriles masivos)
 
-class OSINTTool:
-    id: str
-    name: str
-    supported_targets: List[str]  # ["domain","ip","email"]
+    def iter_batch(self, targets: List[str], scan_id: int | None = None, cancel: CancelToken | None = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        # Pares (objetivo, hallazgo); por defecto, una ejecución por objetivo
+        for target in targets:
+            if cancel and cancel.cancelled:
+                return
+            for item in self.iter_findings(target, scan_id, cancel):
+                yield target, item
 
-    def run(self, target: str, scan_id: int | None = None) -> List[Dict[str, Any]]:
-        raise NotImplementedError
+    def run(self, target: str, scan_id: int | None = None, cancel: CancelToken | None = None) -> List[Dict[str, Any]]:
+        return list(self.iter_findings(target, scan_id, cancel))
 
 TOOLS_REGISTRY: Dict[str, OSINTTool] = {}
 
 def register_tool(tool: OSINTTool):
-    TOOLS_REGISTRY[tool.id] = tool
\ No newline at end of file
+    TOOLS_REGISTRY[tool.id] = tool
@@ -1,46 +1,72 @@
-import httpx
-from typing import List, Dict, Any
+import asyncio
+from typing import Iterator, Dict, Any, List, Tuple
+from urllib.parse import quote
 from .base import OSINTTool
+from .http import http, RateLimit
+from ..cancel import CancelToken
 from ..config import settings
 
 class HIBPTool(OSINTTool):
     id = "hibp"
     name = "Have I Been Pwned"
     supported_targets = ["email"]
+    profile = "http"
+    batch = True
 
-    def run(self, target: str) -> List[Dict[str, Any]]:
-        # Solo emails. Si no lo es, retorna sin hallazgos.
-        if "@" not in target:
-            return []
-        api_key = settings.HIBP_API_KEY
-        headers = {
-            "hibp-api-key": api_key,
-            "User-Agent": "osint-dashboard",
-        }
-        url = f"https://haveibeenpwned.com/api/v3/breachedaccount/{target}"
+    def _limit(self) -> RateLimit:
+        # El límite de HIBP es por API key: el bucket se comparte entre todos los workers
+        return RateLimit("hibp", settings.HIBP_RATE_PER_MINUTE / 60.0, 1)
+
+    async def _check(self, email: str) -> List[Dict[str, Any]]:
+        headers = {"hibp-api-key": settings.HIBP_API_KEY}
+        url = f"https://haveibeenpwned.com/api/v3/breachedaccount/{quote(email)}"
         try:
-            r = httpx.get(url, headers=headers, timeout=20)
-            if r.status_code == 200:
-                breaches = r.json()
-                findings = []
-                for b in breaches:
-                    findings.append({
-                        "tool": self.id,
-                        "category": "leak",
-                        "value": b.get("Name", "Unknown"),
-                        "severity": "high",
-                        "meta": {
-                            "domain": b.get("Domain"),
-                            "breachDate": b.get("BreachDate"),
-                            "pwnCount": b.get("PwnCount"),
-                            "dataClasses": b.get("DataClasses", []),
-                        },
-                        "raw": b,
-                    })
-                return findings
-            elif r.status_code == 404:
+            r = await http.request("GET", url, headers=headers, params={"truncateResponse": "false"}, limit=self._limit())
+            if r.status_code == 404:
                 return []
-            else:
-                return [{"tool": self.id, "category": "error", "value": f"HTTP {r.status_code}", "severity": "info", "meta": {}, "raw": r.text}]
+            if r.status_code != 200:
+                return [{"tool": self.id, "category": "error", "value": f"HTTP {r.status_code}", "severity": "info", "meta": {"email": email}, "raw": r.text}]
+            return [{
+                "tool": self.id,
+                "category": "leak",
+                "value": b.get("Name", "Unknown"),
+                "severity": "high",
+                "meta": {
+                    "email": email,
+                    "domain": b.get("Domain"),
+                    "breachDate": b.get("BreachDate"),
+                    "pwnCount": b.get("PwnCount"),
+                    "dataClasses": b.get("DataClasses", []),
+                },
+                "raw": b,
+            } for b in r.json()]
         except Exception as e:
-            return [{"tool": self.id, "category": "error", "value": str(e), "severity": "info", "meta": {}, "raw": None}]
\ No newline at end of file
+            return [{"tool": self.id, "category": "error", "value": str(e), "severity": "info", "meta": {"email": email}, "raw": None}]
+
+    async def check_emails(self, emails: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        # Consultas concurrentes acotadas; el ritmo real lo marca el token bucket compartido
+        sem = asyncio.Semaphore(max(1, settings.HIBP_CONCURRENCY))
+
+        async def one(email: str):
+            async with sem:
+                return email, await self._check(email)
+
+        emails = [e for e in dict.fromkeys(emails) if "@" in e]
+        return dict(await asyncio.gather(*(one(e) for e in emails)))
+
+    def check_batch(self, emails: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        return http.run(self.check_emails(emails))
+
+    def iter_batch(self, targets: List[str], scan_id: int | None = None, cancel: CancelToken | None = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        # Los carriles masivos envían el lote completo: las consultas van en paralelo bajo el token bucket
+        if not settings.HIBP_API_KEY:
+            return
+        for email, items in self.check_batch(targets).items():
+            for item in items:
+                yield email, item
+
+    def iter_findings(self, target: str, scan_id: int | None = None, cancel: CancelToken | None = None) -> Iterator[Dict[str, Any]]:
+        # Solo emails. Si no lo es, retorna sin hallazgos.
+        if "@" not in target or not settings.HIBP_API_KEY:
+            return
+        yield from self.check_batch([target]).get(target, [])
@@ -0,0 +1,136 @@
+# Módulo: cliente HTTP compartido para los plugins basados en APIs
+# Pool keep-alive (httpx.AsyncClient), token bucket coordinado entre workers vía Redis y
+# reintentos con backoff que respetan Retry-After.
+import asyncio
+import os
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+import httpx
+import redis.asyncio as aredis
+from ..config import settings
+
+# Token bucket atómico con el reloj de Redis (común a todos los workers).
+# Devuelve 0 si se concede la ficha o los milisegundos a esperar.
+_TOKEN_BUCKET = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + (now - ts) * rate / 1000)
+local wait = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+else
+  wait = math.ceil((1 - tokens) * 1000 / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst * 1000 / rate) + 1000)
+return wait
+"""
+
+RETRY_STATUSES = {429, 502, 503, 504}
+
+def _retry_after(resp: httpx.Response) -> float | None:
+    value = resp.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+        return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+class RateLimit:
+    """Límite compartido: ``rate`` peticiones/segundo con ráfagas de hasta ``burst``."""
+
+    def __init__(self, name: str, rate: float, burst: int = 1):
+        self.key = f"ratelimit:{name}"
+        self.rate = rate
+        self.burst = max(1, burst)
+
+class PluginHTTP:
+    """Un event loop en segundo plano por proceso con un AsyncClient reutilizable.
+
+    Los plugins (código síncrono dentro de Celery) llaman a ``run(coro)`` o ``get(...)``;
+    las corrutinas comparten el pool de conexiones y el limitador.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid: int | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._client: httpx.AsyncClient | None = None
+        self._redis = None
+        self._bucket = None
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        # Tras un fork (prefork de Celery) el hilo del loop no existe en el hijo: crear uno nuevo
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="plugin-http-loop", daemon=True).start()
+                self._loop, self._pid = loop, os.getpid()
+                self._client = self._redis = self._bucket = None
+            return self._loop
+
+    def run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop()).result()
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=settings.HTTP_TIMEOUT,
+                limits=httpx.Limits(max_connections=settings.HTTP_MAX_CONNECTIONS,
+                                    max_keepalive_connections=settings.HTTP_MAX_CONNECTIONS),
+                headers={"User-Agent": "osint-dashboard"},
+            )
+        return self._client
+
+    async def acquire(self, limit: RateLimit) -> None:
+        if self._bucket is None:
+            self._redis = aredis.from_url(settings.REDIS_URL, decode_responses=True)
+            self._bucket = self._redis.register_script(_TOKEN_BUCKET)
+        while True:
+            try:
+                wait_ms = int(await self._bucket(keys=[limit.key], args=[limit.rate, limit.burst]))
+            except Exception:
+                return  # sin Redis no se bloquea a los plugins
+            if wait_ms <= 0:
+                return
+            await asyncio.sleep(wait_ms / 1000)
+
+    async def request(self, method: str, url: str, *, limit: RateLimit | None = None,
+                      retries: int | None = None, **kwargs) -> httpx.Response:
+        retries = settings.HTTP_RETRIES if retries is None else retries
+        client = self._get_client()
+        for attempt in range(retries + 1):
+            if limit:
+                await self.acquire(limit)
+            backoff = min(settings.HTTP_MAX_BACKOFF, (2 ** attempt) + random.random())
+            try:
+                resp = await client.request(method, url, **kwargs)
+            except httpx.TransportError:
+                if attempt >= retries:
+                    raise
+                await asyncio.sleep(backoff)
+                continue
+            if resp.status_code in RETRY_STATUSES and attempt < retries:
+                delay = _retry_after(resp)
+                await asyncio.sleep(min(settings.HTTP_MAX_BACKOFF, delay if delay is not None else backoff))
+                continue
+            return resp
+        return resp
+
+    def get(self, url: str, **kwargs) -> httpx.Response:
+        return self.run(self.request("GET", url, **kwargs))
+
+http = PluginHTTP()
@@ -0,0 +1,129 @@
+# Módulo: validación y normalización de la salida de las herramientas
+# Validadores precompilados para dominios, IPs y emails, normalización IDNA/minúsculas y filtro de
+# alcance (el activo debe colgar del dominio objetivo). Lo que no valida no llega a `findings`.
+import ipaddress
+import re
+from functools import lru_cache
+
+_LABEL = r"(?!-)[a-z0-9_-]{1,63}(?<!-)"
+DOMAIN_RE = re.compile(rf"(?:{_LABEL}\.)+(?:[a-z]{{2,63}}|xn--[a-z0-9-]{{1,59}})")
+EMAIL_LOCAL_RE = re.compile(r"[a-z0-9!#$%&'*+/=?^_`{|}~-]+(?:\.[a-z0-9!#$%&'*+/=?^_`{|}~-]+)*")
+# Candidatos dentro de una línea libre (banners, logs), en una sola pasada; se validan después.
+# El orden importa: email antes que host (el dominio del email no cuenta como host) e IP antes que host.
+TOKEN_RE = re.compile(
+    r"(?P<email>[\w.+'-]+@[\w.-]+\.\w+)"
+    r"|(?P<ip>(?<![\d.])(?:\d{1,3}\.){3}\d{1,3}(?![\d.]))"
+    r"|(?P<host>(?<![\w@.-])(?:\*\.)?(?:[\w-]+\.)+[\w-]{2,}(?![\w@-]))",
+    re.UNICODE,
+)
+
+@lru_cache(maxsize=65536)
+def _normalize_domain(host: str) -> str | None:
+    host = host.strip().lower().rstrip(".")
+    if host.startswith("*."):
+        host = host[2:]
+    if not host.isascii():
+        try:
+            host = host.encode("idna").decode("ascii")
+        except UnicodeError:
+            return None
+    if len(host) > 253 or not DOMAIN_RE.fullmatch(host):
+        return None
+    return host
+
+def normalize_domain(value) -> str | None:
+    """Dominio en minúsculas y ASCII (punycode), sin punto final ni comodín; None si no es válido."""
+    # Las salidas repiten mucho los mismos nombres: la validación se memoiza por valor crudo
+    return _normalize_domain(str(value)) if value else None
+
+_IPV4_RE = re.compile(r"(?:25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)(?:\.(?:25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)){3}")
+
+@lru_cache(maxsize=65536)
+def _normalize_ip(text: str) -> str | None:
+    text = text.strip()
+    # Camino rápido IPv4 (ya canónica); ipaddress solo para IPv6 y formas raras
+    if _IPV4_RE.fullmatch(text):
+        return text
+    if ":" not in text:
+        return None
+    try:
+        return ipaddress.ip_address(text).compressed
+    except ValueError:
+        return None
+
+def normalize_ip(value) -> str | None:
+    return _normalize_ip(str(value)) if value else None
+
+def normalize_email(value) -> str | None:
+    if not value:
+        return None
+    local, sep, domain = str(value).strip().lower().rpartition("@")
+    if not sep or len(local) > 64 or not EMAIL_LOCAL_RE.fullmatch(local):
+        return None
+    domain = normalize_domain(domain)
+    return f"{local}@{domain}" if domain else None
+
+def in_scope(domain: str, scope: str | None) -> bool:
+    return not scope or domain == scope or domain.endswith("." + scope)
+
+# Tamaño de cada generación de los conjuntos de deduplicación por ejecución: la memoria no crece con la
+# salida. Un valor olvidado puede volver a emitirse; los activos se deduplican igualmente en el upsert.
+SEEN_MAX = 200_000
+LINES_MAX = 20_000
+
+class Normalizer:
+    """Valida, normaliza, filtra por alcance y deduplica los valores de una ejecución.
+
+    Cada método devuelve el valor normalizado la primera vez que aparece y ``None`` si no es
+    válido, está fuera del alcance de ``target`` o ya se emitió.
+    """
+
+    def __init__(self, target: str | None = None, scoped: bool = True):
+        self.scope = normalize_domain(target) if scoped and target else None
+        # Conjuntos acotados en dos generaciones: al llenarse la joven pasa a vieja y la anterior se descarta,
+        # así se recuerda al menos lo último visto con el coste de un set
+        self._seen: set[tuple[str, str]] = set()
+        self._seen_old: set[tuple[str, str]] = set()
+        self._lines: set[str] = set()
+        self._lines_old: set[str] = set()
+
+    def _first(self, kind: str, value: str | None) -> str | None:
+        key = (kind, value)
+        if value is None or key in self._seen or key in self._seen_old:
+            return None
+        if len(self._seen) >= SEEN_MAX:
+            self._seen_old, self._seen = self._seen, set()
+        self._seen.add(key)
+        return value
+
+    def host(self, value) -> str | None:
+        host = normalize_domain(value)
+        return self._first("host", host) if host and in_scope(host, self.scope) else None
+
+    def email(self, value) -> str | None:
+        email = normalize_email(value)
+        return self._first("email", email) if email and in_scope(email.rpartition("@")[2], self.scope) else None
+
+    def ip(self, value) -> str | None:
+        return self._first("ip", normalize_ip(value))
+
+    def scan_line(self, line: str):
+        """Extrae (categoría, valor) válidos de una línea de texto libre."""
+        # Una línea repetida solo puede producir valores ya emitidos
+        if "." not in line or line in self._lines or line in self._lines_old:
+            return
+        if len(self._lines) >= LINES_MAX:
+            self._lines_old, self._lines = self._lines, set()
+        self._lines.add(line)
+        for email, ip, host in TOKEN_RE.findall(line):
+            if email:
+                value = self.email(email)
+                kind = "email"
+            elif ip:
+                value = self.ip(ip)
+                kind = "ip"
+            else:
+                value = self.host(host)
+                kind = "host"
+            if value:
+                yield kind, value
@@ -0,0 +1,220 @@
+# Módulo: ejecución gobernada de binarios externos
+# Timeouts de reloj y de inactividad, rlimits, grupo de procesos propio (la parada mata todo el árbol),
+# semáforo por binario compartido entre workers y registro scan → host/pid para la cancelación.
+import json
+import os
+import queue
+import resource
+import signal
+import socket
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+import redis as redislib
+from ..cancel import CancelToken
+from ..config import settings
+from ..logs import scan_log
+from ..metrics import TOOL_LINES
+
+r = redislib.from_url(settings.REDIS_URL, decode_responses=True)
+
+class ProcessTimeout(Exception):
+    pass
+
+# Semáforo con arrendamiento: las entradas caducan solas si el worker muere sin liberarlas
+_acquire_slot = r.register_script("""
+local t = redis.call('TIME')
+local now = tonumber(t[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[1]) then
+  redis.call('ZADD', KEYS[1], now + tonumber(ARGV[3]), ARGV[2])
+  redis.call('EXPIRE', KEYS[1], tonumber(ARGV[3]))
+  return 1
+end
+return 0
+""")
+
+# Renovación del arrendamiento (mismo reloj de Redis); XX: una entrada ya caducada no se recrea
+_renew_slot = r.register_script("""
+local t = redis.call('TIME')
+if redis.call('ZADD', KEYS[1], 'XX', 'CH', tonumber(t[1]) + tonumber(ARGV[2]), ARGV[1]) == 1 then
+  redis.call('EXPIRE', KEYS[1], tonumber(ARGV[2]))
+end
+return 1
+""")
+
+# Arrendamiento corto renovado desde el bucle de lectura: no depende de RUNNER_WALL_TIMEOUT (0 = sin
+# límite) y el hueco de un worker muerto se libera en SLOT_LEASE segundos
+SLOT_LEASE = 120
+SLOT_RENEW_EVERY = SLOT_LEASE / 4
+
+# Callback del consumidor para los silencios del proceso (p.ej. volcar el buffer de la ingesta por tiempo).
+# Se invoca desde el bucle de lectura, es decir, en el hilo del consumidor: puede usar su sesión de BD.
+_idle = threading.local()
+
+@contextmanager
+def on_idle(fn: Callable[[], None]):
+    prev = getattr(_idle, "fn", None)
+    _idle.fn = fn
+    try:
+        yield
+    finally:
+        _idle.fn = prev
+
+def procs_key(scan_id: int) -> str:
+    return f"scan:{scan_id}:procs"
+
+def _slot_key(binary: str) -> str:
+    return f"procsem:{os.path.basename(binary)}"
+
+def _acquire(binary: str, token: str, limit: int, lease: int, scan_id, cancel: CancelToken | None) -> bool:
+    waiting = False
+    while not (cancel and cancel.cancelled):
+        try:
+            if _acquire_slot(keys=[_slot_key(binary)], args=[limit, token, lease]):
+                return True
+        except Exception:
+            return True  # sin Redis no se limita la concurrencia
+        if not waiting:
+            scan_log(scan_id, f"[{binary}] esperando turno (máx. {limit} en paralelo)")
+            waiting = True
+        time.sleep(0.5)
+    return False
+
+def _renew(binary: str, token: str) -> None:
+    try:
+        _renew_slot(keys=[_slot_key(binary)], args=[token, SLOT_LEASE])
+    except Exception:
+        pass
+
+def _release(binary: str, token: str) -> None:
+    try:
+        r.zrem(_slot_key(binary), token)
+    except Exception:
+        pass
+
+def _apply_limits(pid: int) -> None:
+    # prlimit sobre el hijo ya creado: evita preexec_fn, que no es seguro en workers con hilos
+    limits = []
+    if settings.RUNNER_MAX_MEMORY_MB > 0:
+        limits.append((resource.RLIMIT_AS, settings.RUNNER_MAX_MEMORY_MB * 1024 * 1024))
+    if settings.RUNNER_MAX_CPU_SECONDS > 0:
+        limits.append((resource.RLIMIT_CPU, settings.RUNNER_MAX_CPU_SECONDS))
+    for res, value in limits:
+        try:
+            resource.prlimit(pid, res, (value, value))
+        except (AttributeError, OSError, ValueError):
+            pass
+
+def kill_group(p: subprocess.Popen, grace: float | None = None) -> None:
+    """SIGTERM al grupo completo y SIGKILL si no termina en ``grace`` segundos."""
+    grace = settings.RUNNER_KILL_GRACE if grace is None else grace
+    for sig in (signal.SIGTERM, signal.SIGKILL):
+        try:
+            os.killpg(p.pid, sig)
+        except (ProcessLookupError, PermissionError):
+            return
+        try:
+            p.wait(timeout=grace)
+            return
+        except subprocess.TimeoutExpired:
+            continue
+
+def _pump(stream, lines: queue.Queue) -> None:
+    try:
+        for line in stream:
+            lines.put(line)
+    except (OSError, ValueError):
+        pass
+    finally:
+        stream.close()
+        lines.put(None)
+
+def _register(scan_id, p: subprocess.Popen, binary: str) -> str:
+    field = f"{socket.gethostname()}:{p.pid}"
+    if scan_id:
+        try:
+            from celery import current_task
+            task_id = current_task.request.id if current_task else None
+            r.hset(procs_key(scan_id), field, json.dumps({"binary": binary, "pgid": p.pid, "task": task_id, "started": time.time()}))
+            r.expire(procs_key(scan_id), 86400)
+        except Exception:
+            pass
+    return field
+
+def _unregister(scan_id, field: str) -> None:
+    if scan_id:
+        try:
+            r.hdel(procs_key(scan_id), field)
+        except Exception:
+            pass
+
+def run_process(cmd: list[str], scan_id: int | None = None, cancel: CancelToken | None = None,
+                timeout: float | None = None, idle_timeout: float | None = None,
+                max_concurrent: int | None = None) -> Iterator[str]:
+    """Ejecuta ``cmd`` y emite sus líneas de salida (stdout+stderr) sin el salto final.
+
+    Lanza ``ProcessTimeout`` si se supera el tiempo total o el de inactividad. Al cancelar,
+    o si el consumidor deja de iterar, se mata el grupo de procesos completo.
+    """
+    binary = cmd[0]
+    timeout = settings.RUNNER_WALL_TIMEOUT if timeout is None else timeout
+    idle_timeout = settings.RUNNER_IDLE_TIMEOUT if idle_timeout is None else idle_timeout
+    limit = settings.RUNNER_MAX_PER_BINARY if max_concurrent is None else max_concurrent
+    token = f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}:{time.monotonic()}"
+    if limit > 0 and not _acquire(binary, token, limit, SLOT_LEASE, scan_id, cancel):
+        return
+    p = None
+    field = None
+    unregister = lambda: None
+    try:
+        p = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                             errors="replace", start_new_session=True)
+        _apply_limits(p.pid)
+        field = _register(scan_id, p, binary)
+        unregister = cancel.on_cancel(lambda: kill_group(p)) if cancel else (lambda: None)
+        lines: queue.Queue = queue.Queue()
+        threading.Thread(target=_pump, args=(p.stdout, lines), name=f"runner-{binary}", daemon=True).start()
+
+        lines_read = TOOL_LINES.labels(binary=os.path.basename(binary))
+        started = last = renewed = time.monotonic()
+        while not (cancel and cancel.cancelled):
+            now = time.monotonic()
+            if limit > 0 and now - renewed >= SLOT_RENEW_EVERY:
+                _renew(binary, token)
+                renewed = now
+            if timeout > 0 and now - started >= timeout:
+                raise ProcessTimeout(f"{binary}: superado el tiempo máximo de {int(timeout)}s")
+            if idle_timeout > 0 and now - last >= idle_timeout:
+                raise ProcessTimeout(f"{binary}: sin salida durante {int(idle_timeout)}s")
+            try:
+                line = lines.get(timeout=0.5)
+            except queue.Empty:
+                idle = getattr(_idle, "fn", None)
+                if idle:
+                    idle()
+                continue
+            if line is None:
+                break
+            last = time.monotonic()
+            lines_read.inc()
+            yield line.rstrip("\n")
+
+        if p.poll() is None and not (cancel and cancel.cancelled):
+            try:
+                p.wait(timeout=settings.RUNNER_KILL_GRACE)
+            except subprocess.TimeoutExpired:
+                pass
+        if p.returncode not in (None, 0) and not (cancel and cancel.cancelled):
+            scan_log(scan_id, f"[{binary}] terminó con código {p.returncode}")
+    finally:
+        unregister()
+        if p is not None:
+            # Salida anticipada (timeout, parada, consumidor cerrado): no dejar nada vivo en el grupo
+            kill_group(p)
+        if field:
+            _unregister(scan_id, field)
+        if limit > 0:
+            _release(binary, token)
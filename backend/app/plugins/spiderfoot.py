@@ -1,35 +1,35 @@
-from typing import List, Dict, Any
-import httpx
+from typing import Iterator, Dict, Any
 from .base import OSINTTool
+from .http import http
+from ..cancel import CancelToken
 from ..config import settings
 
 class SpiderfootTool(OSINTTool):
     id = "spiderfoot"
     name = "Spiderfoot"
     supported_targets = ["domain", "ip"]
+    profile = "http"
 
-    def run(self, target: str) -> List[Dict[str, Any]]:
+    def iter_findings(self, target: str, scan_id: int | None = None, cancel: CancelToken | None = None) -> Iterator[Dict[str, Any]]:
         base = settings.SPIDERFOOT_URL.strip()
         if not base:
-            return []
+            return
         try:
             # Nota: la API y autenticación de Spiderfoot varían por despliegue.
             # Este stub intenta un endpoint genérico; ajustaremos cuando definamos la imagen/API.
-            url = f"{base}/api/query?target={target}"
-            r = httpx.get(url, timeout=30)
+            r = http.get(f"{base}/api/query", params={"target": target}, timeout=30)
             if r.status_code != 200:
-                return [{"tool": self.id, "category": "error", "value": f"HTTP {r.status_code}", "severity": "info", "meta": {}, "raw": r.text}]
+                yield {"tool": self.id, "category": "error", "value": f"HTTP {r.status_code}", "severity": "info", "meta": {}, "raw": r.text}
+                return
             data = r.json()
-            findings: List[Dict[str, Any]] = []
             for item in data.get("results", []):
-                findings.append({
+                yield {
                     "tool": self.id,
                     "category": item.get("category", "info"),
                     "value": item.get("value", ""),
                     "severity": item.get("severity", "info"),
                     "meta": item,
                     "raw": item
-                })
-            return findings
+                }
         except Exception as e:
-            return [{"tool": self.id, "category": "error", "value": str(e), "severity": "info", "meta": {}, "raw": None}]
\ No newline at end of file
+            yield {"tool": self.id, "category": "error", "value": str(e), "severity": "info", "meta": {}, "raw": None}
\ No newline at end of file
@@ -1,53 +1,84 @@
-import shutil, subprocess
-from typing import List, Dict, Any
+import json
+import os
+import shutil
+import tempfile
+import xml.etree.ElementTree as ET
+from typing import Iterator, Dict, Any, Iterable, Tuple
 from .base import OSINTTool
-from ..config import settings
-import redis as redislib
-
-r = redislib.from_url(settings.REDIS_URL, decode_responses=True)
+from .parsing import Normalizer
+from .runner import run_process
+from ..cancel import CancelToken
+from ..logs import scan_log
 
 class TheHarvesterTool(OSINTTool):
     id = "theharvester"
     name = "TheHarvester"
     supported_targets = ["domain"]
+    cacheable = True
+
+    def _from_json(self, path: str) -> Iterable[Tuple[str, str]]:
+        with open(path, encoding="utf-8", errors="replace") as fh:
+            data = json.load(fh)
+        for email in data.get("emails") or []:
+            yield "email", email
+        for host in data.get("hosts") or []:
+            # Las entradas pueden venir como "host:ip"
+            name, _, ip = str(host).partition(":")
+            yield "host", name
+            if ip:
+                yield "ip", ip
+        for ip in data.get("ips") or []:
+            yield "ip", ip
+
+    def _from_xml(self, path: str) -> Iterable[Tuple[str, str]]:
+        tags = {"email": "email", "hostname": "host", "host": "host", "ip": "ip"}
+        for _, el in ET.iterparse(path):
+            kind = tags.get(el.tag)
+            if kind and el.text and el.text.strip():
+                name, _, ip = el.text.strip().partition(":") if kind == "host" else (el.text.strip(), "", "")
+                yield kind, name
+                if ip:
+                    yield "ip", ip
+            el.clear()
 
-    def run(self, target: str, scan_id: int | None = None) -> List[Dict[str, Any]]:
+    def _from_stdout(self, path: str, target: str) -> Iterable[Tuple[str, str]]:
+        scrape = Normalizer(target)
+        with open(path, encoding="utf-8", errors="replace") as fh:
+            for line in fh:
+                yield from scrape.scan_line(line)
+
+    def iter_findings(self, target: str, scan_id: int | None = None, cancel: CancelToken | None = None) -> Iterator[Dict[str, Any]]:
         if not shutil.which("theHarvester"):
-            return []
-        cmd = ["theHarvester", "-d", target, "-b", "all", "-n"]
+            return
+        norm = Normalizer(target)
+        validate = {"email": norm.email, "host": norm.host, "ip": norm.ip}
         try:
-            p = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
-            findings: List[Dict[str, Any]] = []
-            while True:
-                line = p.stdout.readline()
-                if not line:
-                    break
-                l = line.strip()
-                if scan_id:
-                    try:
-                        r.publish(f"scan:{scan_id}:logs", f"[theharvester] {l}")
-                    except Exception:
-                        pass
-                # parseo de emails/hosts y push a findings
-                if "@" in l and "." in l:
-                    findings.append({"tool": self.id, "category": "email", "value": l, "severity": "info", "meta": {}, "raw": l})
-                elif "." in l and " " not in l:
-                    findings.append({"tool": self.id, "category": "host", "value": l, "severity": "info", "meta": {}, "raw": l})
-                if scan_id and r.get(f"scan:{scan_id}:stop") == "1":
-                    try:
-                        p.terminate()
-                    except Exception:
-                        pass
-                    break
-            try:
-                p.wait(timeout=5)
-            except Exception:
-                pass
-            return findings
+            with tempfile.TemporaryDirectory(prefix="theharvester-") as tmp:
+                out = os.path.join(tmp, "result")
+                cmd = ["theHarvester", "-d", target, "-b", "all", "-n", "-f", out]
+                # stdout va al log y a un fichero del directorio temporal (no a memoria); los hallazgos
+                # salen del fichero estructurado que escribe -f
+                spool = os.path.join(tmp, "stdout.txt")
+                with open(spool, "w", encoding="utf-8") as fh:
+                    for line in run_process(cmd, scan_id, cancel):
+                        scan_log(scan_id, f"[theharvester] {line.strip()}")
+                        fh.write(line + "\n")
+                if cancel and cancel.cancelled:
+                    return
+
+                if os.path.exists(out + ".json"):
+                    pairs, source = self._from_json(out + ".json"), "json"
+                elif os.path.exists(out + ".xml"):
+                    pairs, source = self._from_xml(out + ".xml"), "xml"
+                else:
+                    # Versiones sin -f: solo los valores de stdout que pasan validación y alcance
+                    pairs, source = self._from_stdout(spool, target), "stdout"
+
+                for kind, value in pairs:
+                    value = validate[kind](value)
+                    if value:
+                        yield {"tool": self.id, "category": kind, "value": value, "severity": "info",
+                               "meta": {"source": source}, "raw": value}
         except Exception as e:
-            if scan_id:
-                try:
-                    r.publish(f"scan:{scan_id}:logs", f"[theharvester] error: {e}")
-                except Exception:
-                    pass
-            return [{"tool": self.id, "category": "error", "value": str(e), "severity": "info", "meta": {}, "raw": None}]
\ No newline at end of file
+            scan_log(scan_id, f"[theharvester] error: {e}")
+            yield {"tool": self.id, "category": "error", "value": str(e), "severity": "info", "meta": {}, "raw": None}
@@ -0,0 +1,210 @@
+# Módulo: borrado en dos fases de proyectos y scans
+# Fase 1 (petición): deleted_at los oculta de los listados, se paran sus scans en curso y se descuentan
+# del resumen. Fase 2 (job Celery en la cola maintenance): DELETE por lotes de ids con un commit por
+# lote, así que ni la memoria ni la duración de cada transacción dependen del número de hallazgos.
+# El progreso del job se guarda en Redis (job:{id}) y se consulta en /api/jobs/{id}.
+import glob
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import Session
+import redis as redislib
+from .config import settings
+from .models import ACTIVE_STATUSES, Asset, Finding, Project, Scan, ScanDelta, ScanDiff, Schedule
+from . import changes, summary
+
+r = redislib.from_url(settings.REDIS_URL, decode_responses=True)
+
+ID_BATCH = 500  # ids por cláusula IN
+LOCK_TTL = 600
+WAIT_RETRY_SECONDS = 30
+
+def job_key(job_id: str) -> str:
+    return f"job:{job_id}"
+
+def lock_key(kind: str, target_id: int) -> str:
+    return f"purge:lock:{kind}:{target_id}"
+
+def new_job(kind: str, target_id: int) -> str:
+    job_id = uuid.uuid4().hex
+    try:
+        r.hset(job_key(job_id), mapping={"id": job_id, "kind": f"purge_{kind}", "target_id": target_id,
+                                         "status": "queued", "total": 0, "done": 0, "created_at": time.time()})
+        r.expire(job_key(job_id), settings.JOB_TTL)
+    except Exception:
+        pass
+    return job_id
+
+def _job_update(job_id: str, **fields) -> None:
+    try:
+        r.hset(job_key(job_id), mapping=fields)
+    except Exception:
+        pass
+
+def _job_advance(job_id: str, rows: int, lock: str) -> None:
+    try:
+        pipe = r.pipeline(transaction=False)
+        pipe.hincrby(job_key(job_id), "done", rows)
+        pipe.expire(lock, LOCK_TTL)
+        pipe.execute()
+    except Exception:
+        pass
+
+def read_job(job_id: str) -> dict | None:
+    try:
+        job = r.hgetall(job_key(job_id))
+    except Exception:
+        return None
+    if not job:
+        return None
+    for field in ("target_id", "total", "done"):
+        job[field] = int(job.get(field) or 0)
+    for field in ("created_at", "finished_at"):
+        job[field] = float(job[field]) if job.get(field) else None
+    return job
+
+def _stop_scans(scan_ids) -> None:
+    # Los workers dejan de ingerir en cuanto ven la clave de parada
+    try:
+        pipe = r.pipeline(transaction=False)
+        for scan_id in scan_ids:
+            pipe.setex(f"scan:{scan_id}:stop", 600, "1")
+        pipe.execute()
+    except Exception:
+        pass
+
+# Fase 1
+def soft_delete_scan(db: Session, scan: Scan) -> None:
+    # Los hooks de sesión de summary/changes tratan deleted_at como un borrado
+    scan.deleted_at = datetime.utcnow()
+    db.commit()
+
+def soft_delete_project(db: Session, project: Project) -> None:
+    now = datetime.utcnow()
+    scan_ids = [sid for (sid,) in db.execute(select(Scan.id).where(Scan.project_id == project.id, Scan.deleted_at.is_(None)))]
+    _stop_scans(scan_ids)
+    project.deleted_at = now
+    db.execute(update(Scan).where(Scan.project_id == project.id, Scan.deleted_at.is_(None)).values(deleted_at=now))
+    # Los schedules son pocas filas: se eliminan ya para que no lancen scans sobre el proyecto borrado
+    schedule_ids = [sid for (sid,) in db.execute(select(Schedule.id).where(Schedule.project_id == project.id))]
+    db.execute(delete(Schedule).where(Schedule.project_id == project.id))
+    db.commit()
+    # El UPDATE masivo no pasa por los hooks de sesión
+    summary.forget_project(project.id, scan_ids)
+    changes.publish("scans", [{"id": sid, "deleted": True} for sid in scan_ids])
+    changes.publish("schedules", [{"id": sid, "deleted": True} for sid in schedule_ids])
+
+# Fase 2
+def _delete_chunked(db: Session, table, col, ids: list[int], job_id: str, lock: str) -> None:
+    for i in range(0, len(ids), ID_BATCH):
+        batch = ids[i:i + ID_BATCH]
+        while True:
+            chunk = select(table.c.id).where(col.in_(batch)).limit(settings.PURGE_CHUNK_ROWS)
+            n = db.execute(delete(table).where(table.c.id.in_(chunk.scalar_subquery()))).rowcount
+            db.commit()
+            if n:
+                _job_advance(job_id, n, lock)
+            if n < settings.PURGE_CHUNK_ROWS:
+                break
+
+def _count(db: Session, table, col, ids: list[int]) -> int:
+    return sum(db.execute(select(func.count()).select_from(table).where(col.in_(ids[i:i + ID_BATCH]))).scalar()
+               for i in range(0, len(ids), ID_BATCH))
+
+def _still_running(db: Session, scan_ids: list[int]) -> bool:
+    # Las herramientas de un scan en curso siguen insertando hasta que ven la clave de parada y
+    # finalize_scan cambia el estado; pasado PURGE_ACTIVE_WAIT_MINUTES su tarea se da por muerta
+    cutoff = datetime.utcnow() - timedelta(minutes=settings.PURGE_ACTIVE_WAIT_MINUTES)
+    return any(db.execute(select(Scan.id).where(Scan.id.in_(scan_ids[i:i + ID_BATCH]),
+                                                Scan.status.in_(ACTIVE_STATUSES), Scan.deleted_at > cutoff).limit(1)).first()
+               for i in range(0, len(scan_ids), ID_BATCH))
+
+def _purge_scans(db: Session, scan_ids: list[int], job_id: str, lock: str) -> None:
+    findings, deltas = Finding.__table__, ScanDelta.__table__
+    _delete_chunked(db, findings, findings.c.scan_id, scan_ids, job_id, lock)
+    _delete_chunked(db, deltas, deltas.c.scan_id, scan_ids, job_id, lock)
+    for i in range(0, len(scan_ids), ID_BATCH):
+        batch = scan_ids[i:i + ID_BATCH]
+        db.execute(delete(ScanDiff).where(ScanDiff.scan_id.in_(batch)))
+        db.execute(delete(Scan).where(Scan.id.in_(batch)))
+        db.commit()
+        _job_advance(job_id, len(batch), lock)
+    for scan_id in scan_ids:
+        for path in glob.glob(os.path.join(settings.REPORTS_DIR, f"scan_{scan_id}_*.pdf")):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+def purge(db: Session, job_id: str, kind: str, target_id: int) -> dict:
+    """Elimina físicamente un scan o un proyecto ya marcados con deleted_at. Idempotente.
+
+    Devuelve status "waiting" mientras alguno de sus scans siga en curso: la tarea se reintenta.
+    """
+    lock = lock_key(kind, target_id)
+    try:
+        if not r.set(lock, job_id, nx=True, ex=LOCK_TTL) and r.get(lock) != job_id:
+            _job_update(job_id, status="skipped", finished_at=time.time())
+            return {"status": "skipped"}
+    except Exception:
+        pass
+    _job_update(job_id, status="running", started_at=time.time())
+    try:
+        if kind == "project":
+            project = db.get(Project, target_id)
+            if project is not None and project.deleted_at is None:
+                raise ValueError("el proyecto no está marcado como borrado")
+            scan_ids = [sid for (sid,) in db.execute(select(Scan.id).where(Scan.project_id == target_id))]
+        else:
+            scan = db.get(Scan, target_id)
+            if scan is not None and scan.deleted_at is None:
+                raise ValueError("el scan no está marcado como borrado")
+            scan_ids = [target_id] if scan is not None else []
+        if _still_running(db, scan_ids):
+            db.rollback()
+            _job_update(job_id, status="waiting")
+            return {"status": "waiting"}
+        # Total estimado para el progreso: hallazgos + deltas + filas de scans (+ assets del proyecto)
+        total = (_count(db, Finding.__table__, Finding.scan_id, scan_ids)
+                 + _count(db, ScanDelta.__table__, ScanDelta.scan_id, scan_ids) + len(scan_ids))
+        if kind == "project":
+            total += _count(db, Asset.__table__, Asset.project_id, [target_id]) + 1
+        _job_update(job_id, total=total)
+        _purge_scans(db, scan_ids, job_id, lock)
+        if kind == "project":
+            assets = Asset.__table__
+            _delete_chunked(db, assets, assets.c.project_id, [target_id], job_id, lock)
+            db.execute(delete(Schedule).where(Schedule.project_id == target_id))
+            db.execute(delete(Project).where(Project.id == target_id))
+            db.commit()
+            _job_advance(job_id, 1, lock)
+        _job_update(job_id, status="completed", finished_at=time.time())
+        return {"status": "completed", "scans": len(scan_ids)}
+    except Exception as e:
+        db.rollback()
+        _job_update(job_id, status="error", error=str(e), finished_at=time.time())
+        return {"status": "error", "error": str(e)}
+    finally:
+        try:
+            if r.get(lock) == job_id:
+                r.delete(lock)
+        except Exception:
+            pass
+
+def pending_purges(db: Session, limit: int = 100) -> list[tuple[str, int]]:
+    # Borrados cuya purga no llegó a completarse (worker caído, job perdido); los scans de un
+    # proyecto borrado se purgan con el proyecto
+    cutoff = datetime.utcnow() - timedelta(minutes=settings.PURGE_RETRY_MINUTES)
+    projects = db.execute(select(Project.id).where(Project.deleted_at.is_not(None), Project.deleted_at < cutoff).limit(limit))
+    scans = db.execute(
+        select(Scan.id).outerjoin(Project, Project.id == Scan.project_id)
+        .where(Scan.deleted_at.is_not(None), Scan.deleted_at < cutoff, Project.deleted_at.is_(None))
+        .limit(limit)
+    )
+    out = [("project", pid) for (pid,) in projects] + [("scan", sid) for (sid,) in scans]
+    try:
+        return [(kind, target_id) for kind, target_id in out if not r.exists(lock_key(kind, target_id))]
+    except Exception:
+        return out
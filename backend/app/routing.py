@@ -0,0 +1,50 @@
+# Módulo: enrutado de tareas Celery por perfil de recursos
+# Las herramientas declaran `profile` ("subprocess" | "http"); las tareas que las ejecutan van a la
+# cola del pool adecuado sin que los llamadores tengan que indicarla.
+from .config import settings
+from .plugins import TOOLS_REGISTRY
+
+QUEUE_SUBPROCESS = "subprocess"  # pool prefork, concurrencia baja: amass, subfinder, theHarvester
+QUEUE_IO = "io"                  # pool de hilos, concurrencia alta: APIs HTTP
+QUEUE_CONTROL = "control"        # dispatch de schedules, orquestación y agregación de scans
+QUEUE_MAINTENANCE = "maintenance"  # reportes y trabajos de fondo
+
+PROFILE_QUEUES = {"subprocess": QUEUE_SUBPROCESS, "http": QUEUE_IO}
+
+STATIC_ROUTES = {
+    "app.tasks.tick_schedules": QUEUE_CONTROL,
+    "app.tasks.run_scheduled_scan": QUEUE_CONTROL,
+    "app.tasks.finalize_scan": QUEUE_CONTROL,
+    "app.tasks.run_bulk_scan": QUEUE_CONTROL,
+    "app.tasks.render_report": QUEUE_MAINTENANCE,
+    "app.tasks.rebuild_summary": QUEUE_MAINTENANCE,
+    "app.tasks.purge_deleted": QUEUE_MAINTENANCE,
+    "app.tasks.sweep_deleted": QUEUE_MAINTENANCE,
+}
+
+def queue_for_tools(tool_ids) -> str:
+    # Basta una herramienta pesada para que la ejecución necesite el pool prefork
+    profiles = {TOOLS_REGISTRY[t].profile for t in tool_ids or [] if t in TOOLS_REGISTRY}
+    if "subprocess" in profiles or len(profiles) > 1:
+        return QUEUE_SUBPROCESS
+    return PROFILE_QUEUES.get(profiles.pop(), QUEUE_SUBPROCESS) if profiles else QUEUE_IO
+
+def _arg(args, kwargs, index: int, name: str):
+    if name in (kwargs or {}):
+        return kwargs[name]
+    return args[index] if args and len(args) > index else None
+
+def route_task(name, args, kwargs, options, task=None, **kw):
+    if name in STATIC_ROUTES:
+        return {"queue": STATIC_ROUTES[name]}
+    if name == "app.tasks.run_tool":
+        return {"queue": queue_for_tools([_arg(args, kwargs, 2, "tool_id")])}
+    if name == "app.tasks.run_bulk_lane":
+        return {"queue": queue_for_tools(_arg(args, kwargs, 1, "tool_ids"))}
+    if name == "app.tasks.run_scan":
+        tools = _arg(args, kwargs, 2, "tools") or []
+        # En modo paralelo run_scan solo reparte subtareas: no debe esperar tras los escaneos pesados
+        if settings.SCAN_PARALLEL and len([t for t in tools if t in TOOLS_REGISTRY]) > 1:
+            return {"queue": QUEUE_CONTROL}
+        return {"queue": queue_for_tools(tools)}
+    return None
@@ -1,6 +1,6 @@
 # Módulo: imports + clases Schedule
-from pydantic import BaseModel, Field
-from typing import List, Optional, Any
+from pydantic import BaseModel, Field, field_validator
+from typing import List, Optional, Any, Dict
 from datetime import datetime
 
 class ClientCreate(BaseModel):
@@ -27,6 +27,13 @@ class ScanCreate(BaseModel):
     project_id: int
     target: str
     tools: List[str] = Field(default_factory=list)  # e.g. ["amass","subfinder","theharvester","hibp"]
+    force_refresh: bool = False  # ignorar la caché de resultados y volver a ejecutar las herramientas
+
+class BulkScanCreate(BaseModel):
+    project_id: int
+    targets: List[str]
+    tools: List[str] = Field(default_factory=list)
+    force_refresh: bool = False
 
 class ScanOut(BaseModel):
     id: int
@@ -34,9 +41,20 @@ class ScanOut(BaseModel):
     status: str
     tools: List[str]
     project_id: Optional[int]
+    kind: Optional[str] = "single"
+    target_count: Optional[int] = None
     class Config:
         from_attributes = True
 
+class ScanProgress(BaseModel):
+    scan_id: int
+    status: str
+    total: int
+    done: int
+    findings: int
+    errors: int
+    eta_seconds: Optional[int] = None
+
 class FindingOut(BaseModel):
     id: int
     tool: str
@@ -47,6 +65,73 @@ class FindingOut(BaseModel):
     class Config:
         from_attributes = True
 
+class FindingPage(BaseModel):
+    items: List[FindingOut]
+    next_cursor: Optional[int] = None
+
+class FindingCounts(BaseModel):
+    total: int
+    tool: Dict[str, int]
+    category: Dict[str, int]
+    severity: Dict[str, int]
+
+class JobRef(BaseModel):
+    job_id: str
+
+class JobOut(BaseModel):
+    id: str
+    kind: str
+    target_id: int
+    status: str  # queued | running | completed | error | skipped
+    total: int
+    done: int
+    error: Optional[str] = None
+    created_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+class DashboardSummary(BaseModel):
+    project_id: Optional[int] = None
+    scans: Dict[str, int]
+    findings: FindingCounts
+
+class DeltaOut(BaseModel):
+    id: int
+    change: str
+    category: str
+    value: str
+    tool: Optional[str]
+    class Config:
+        from_attributes = True
+
+class ScanDiffOut(BaseModel):
+    scan_id: int
+    base_scan_id: Optional[int]
+    new: int
+    gone: int
+    persisted: Optional[int]
+    items: List[DeltaOut]
+    next_cursor: Optional[int] = None
+
+class AssetOut(BaseModel):
+    id: int
+    category: str
+    value: str
+    first_seen: datetime
+    last_seen: datetime
+    seen_by_tools: List[str]
+    scan_count: int
+    class Config:
+        from_attributes = True
+
+    @field_validator("seen_by_tools", mode="before")
+    @classmethod
+    def split_tools(cls, v):
+        return [t for t in v.split(",") if t] if isinstance(v, str) else v
+
+class AssetPage(BaseModel):
+    items: List[AssetOut]
+    next_cursor: Optional[int] = None
+
 class ScheduleCreate(BaseModel):
     project_id: int
     target: str
@@ -0,0 +1,37 @@
+# Módulo: serialización rápida de listados
+# Los listados calientes seleccionan solo las columnas del schema de salida (tuplas, sin instanciar ORM
+# ni validar cada fila con Pydantic) y se codifican con orjson. Los listados sin límite se envían como
+# un array JSON en streaming, por particiones, para no materializar todo el resultado en memoria.
+import orjson
+from fastapi.responses import Response, StreamingResponse
+from .db import AsyncSessionLocal
+
+STREAM_PARTITION_ROWS = 1000
+
+def dumps(content) -> bytes:
+    # OPT_UTC_Z: las columnas timestamptz (PostgreSQL) salen con "Z", igual que con Pydantic
+    return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+
+def columns_for(model, schema) -> list:
+    # Columnas en el orden de los campos del schema: el JSON resultante coincide con el de response_model
+    return [getattr(model, field) for field in schema.model_fields]
+
+def row_dicts(schema, rows) -> list[dict]:
+    keys = tuple(schema.model_fields)
+    return [dict(zip(keys, row)) for row in rows]
+
+def json_response(content, headers: dict | None = None) -> Response:
+    return Response(dumps(content), media_type="application/json", headers=headers)
+
+async def _iter_array(stmt, keys: tuple):
+    # Sesión propia: la del endpoint se cierra antes de que empiece a enviarse el cuerpo
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(stmt)
+        sep = b"["
+        async for rows in result.partitions(STREAM_PARTITION_ROWS):
+            yield sep + b",".join(dumps(dict(zip(keys, row))) for row in rows)
+            sep = b","
+        yield b"[]" if sep == b"[" else b"]"
+
+def stream_json_array(schema, stmt, headers: dict | None = None) -> StreamingResponse:
+    return StreamingResponse(_iter_array(stmt, tuple(schema.model_fields)), media_type="application/json", headers=headers)
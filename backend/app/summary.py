@@ -0,0 +1,192 @@
+# Módulo: contadores del resumen del dashboard
+# Hashes Redis por proyecto (y uno global) con scans por estado y hallazgos por categoría/severidad/
+# herramienta. Se actualizan en la ingesta (save_findings) y al confirmar cambios de estado de Scan,
+# así que leer el resumen es un HGETALL y no depende del volumen de datos. `rebuild` los recalcula
+# desde la BD (arranque en frío o corrección periódica de deriva).
+from collections import Counter
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session, attributes
+import redis as redislib
+from .config import settings
+from .models import Scan, Finding
+
+r = redislib.from_url(settings.REDIS_URL, decode_responses=True)
+
+GLOBAL_KEY = "summary:all"
+READY_KEY = "summary:ready"
+FACETS = ("category", "severity", "tool")
+
+def project_key(project_id) -> str:
+    return f"summary:p:{project_id if project_id is not None else 'none'}"
+
+def scan_key(scan_id: int) -> str:
+    # Hallazgos por faceta de un scan: permite descontarlos al borrarlo sin consultar la BD
+    return f"summary:scan:{scan_id}"
+
+def _apply(ops: Counter) -> None:
+    if not ops:
+        return
+    try:
+        pipe = r.pipeline(transaction=False)
+        for (key, field), delta in ops.items():
+            if delta:
+                pipe.hincrby(key, field, delta)
+        pipe.execute()
+    except Exception:
+        pass
+
+def record_findings(scan: Scan, items: list[dict]) -> None:
+    ops: Counter = Counter()
+    for key in (GLOBAL_KEY, project_key(scan.project_id), scan_key(scan.id)):
+        ops[(key, "findings")] += len(items)
+    for item in items:
+        for facet, default in (("category", "info"), ("severity", "info"), ("tool", "unknown")):
+            field = f"{facet}:{item.get(facet, default)}"
+            ops[(GLOBAL_KEY, field)] += 1
+            ops[(project_key(scan.project_id), field)] += 1
+            ops[(scan_key(scan.id), field)] += 1
+    _apply(ops)
+
+def forget_project(project_id: int, scan_ids: list[int]) -> None:
+    # Borrado lógico de un proyecto: su hash se resta del global y se descartan los de sus scans
+    try:
+        counts = r.hgetall(project_key(project_id))
+        pipe = r.pipeline(transaction=True)
+        for field, n in counts.items():
+            if int(n):
+                pipe.hincrby(GLOBAL_KEY, field, -int(n))
+        pipe.delete(project_key(project_id))
+        for i in range(0, len(scan_ids), 1000):
+            batch = scan_ids[i:i + 1000]
+            pipe.hdel(STATUS_KEY, *batch)
+            pipe.delete(*[scan_key(sid) for sid in batch])
+        pipe.execute()
+    except Exception:
+        pass
+
+def _forget_scan(scan_id: int, project_id) -> None:
+    # Al borrar un scan se restan sus hallazgos de los agregados
+    try:
+        per_scan = r.hgetall(scan_key(scan_id))
+        r.delete(scan_key(scan_id))
+    except Exception:
+        return
+    ops: Counter = Counter()
+    for field, n in per_scan.items():
+        ops[(GLOBAL_KEY, field)] -= int(n)
+        ops[(project_key(project_id), field)] -= int(n)
+    _apply(ops)
+
+# Estado contabilizado de cada scan. La transición se resuelve en Redis (no con el historial del ORM):
+# la API y los workers escriben `status` desde sesiones distintas y el valor previo que ve una sesión
+# puede estar obsoleto; así una transición repetida o desordenada no descuadra los contadores.
+STATUS_KEY = "summary:status"
+_TRANSITION_LUA = """
+local old = redis.call('HGET', KEYS[1], ARGV[1])
+local new = ARGV[2]
+if old == new then return 0 end
+if new == '' then redis.call('HDEL', KEYS[1], ARGV[1]) else redis.call('HSET', KEYS[1], ARGV[1], new) end
+for i = 2, #KEYS do
+  if old then redis.call('HINCRBY', KEYS[i], 'scans:' .. old, -1) end
+  if new ~= '' then redis.call('HINCRBY', KEYS[i], 'scans:' .. new, 1) end
+end
+return 1
+"""
+_transition = r.register_script(_TRANSITION_LUA)
+
+def _set_status(scan_id: int, project_id, status: str | None) -> None:
+    try:
+        _transition(keys=[STATUS_KEY, GLOBAL_KEY, project_key(project_id)], args=[scan_id, status or ""])
+    except Exception:
+        pass
+
+# Cambios de Scan: se recogen en cada flush y se aplican solo si la transacción confirma
+@event.listens_for(Session, "after_flush")
+def _collect_scan_changes(session, flush_context):
+    changes = session.info.setdefault("summary_scans", {})
+    for obj in session.new:
+        if isinstance(obj, Scan):
+            changes[obj.id] = (obj.project_id, obj.status or "pending")
+    for obj in session.dirty:
+        if isinstance(obj, Scan) and attributes.get_history(obj, "deleted_at").added:
+            # Borrado lógico (app.purge): deja de contar desde ya, aunque las filas sigan hasta la purga
+            changes[obj.id] = (obj.project_id, None)
+        elif isinstance(obj, Scan) and attributes.get_history(obj, "status").added and obj.__dict__.get("deleted_at") is None:
+            changes[obj.id] = (obj.project_id, obj.status)
+    for obj in session.deleted:
+        if isinstance(obj, Scan):
+            changes[obj.id] = (obj.project_id, None)
+
+@event.listens_for(Session, "after_commit")
+def _apply_scan_changes(session):
+    for scan_id, (project_id, status) in session.info.pop("summary_scans", {}).items():
+        _set_status(scan_id, project_id, status)
+        if status is None:
+            _forget_scan(scan_id, project_id)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_scan_changes(session):
+    session.info.pop("summary_scans", None)
+
+def rebuild(db: Session) -> None:
+    """Recalcula todos los contadores con agregados sobre la BD y los publica de forma atómica."""
+    hashes: dict[str, Counter] = {GLOBAL_KEY: Counter()}
+
+    def add(key, field, n):
+        hashes.setdefault(key, Counter())[field] += n
+
+    statuses = {}
+    for scan_id, project_id, status in db.query(Scan.id, Scan.project_id, Scan.status).filter(Scan.deleted_at.is_(None)).yield_per(5000):
+        statuses[scan_id] = status or "pending"
+        add(GLOBAL_KEY, f"scans:{statuses[scan_id]}", 1)
+        add(project_key(project_id), f"scans:{statuses[scan_id]}", 1)
+    for facet in FACETS:
+        col = getattr(Finding, facet)
+        rows = (
+            db.query(Finding.scan_id, Scan.project_id, col, func.count(Finding.id))
+            .join(Scan, Scan.id == Finding.scan_id)
+            .filter(Scan.deleted_at.is_(None))
+            .group_by(Finding.scan_id, Scan.project_id, col)
+        )
+        for scan_id, project_id, value, n in rows:
+            field = f"{facet}:{value}"
+            for key in (GLOBAL_KEY, project_key(project_id), scan_key(scan_id)):
+                add(key, field, n)
+                if facet == "category":
+                    add(key, "findings", n)
+
+    try:
+        stale = set(r.scan_iter("summary:p:*")) | set(r.scan_iter("summary:scan:*"))
+        pipe = r.pipeline(transaction=True)
+        for key, counts in hashes.items():
+            pipe.delete(key)
+            if counts:
+                pipe.hset(key, mapping=dict(counts))
+        for key in stale - set(hashes):
+            pipe.delete(key)
+        pipe.delete(STATUS_KEY)
+        if statuses:
+            pipe.hset(STATUS_KEY, mapping=statuses)
+        pipe.set(READY_KEY, "1")
+        pipe.execute()
+    except Exception:
+        pass
+
+def read(db: Session, project_id: int | None = None) -> dict:
+    try:
+        if not r.exists(READY_KEY) and r.set(f"{READY_KEY}:lock", "1", nx=True, ex=60):
+            rebuild(db)
+        raw = r.hgetall(project_key(project_id) if project_id is not None else GLOBAL_KEY)
+    except Exception:
+        raw = {}
+    out = {"project_id": project_id, "scans": {}, "findings": {"total": 0, **{facet: {} for facet in FACETS}}}
+    for field, n in raw.items():
+        kind, _, name = field.partition(":")
+        n = int(n)
+        if kind == "findings":
+            out["findings"]["total"] = n
+        elif n and kind == "scans":
+            out["scans"][name] = n
+        elif n and kind in FACETS:
+            out["findings"][kind][name] = n
+    return out
@@ -1,85 +1,360 @@
 # Módulo: imports y cliente Redis
+import math
+import time
+from collections import Counter
 from datetime import datetime
 from sqlalchemy.orm import Session
 from .db import SessionLocal
-from .models import Scan, Finding
+from .models import Scan
+from .ingest import FindingsIngestor
+from .cancel import cancel_token
+from .logs import scan_log, flush_scan_log
+from .exports import render_pdf_report
+from .diff import prepare_diff, finalize_diff
+from .cache import tool_cache
+from .metrics import EXPORT_SECONDS, TOOL_RUN_SECONDS, timer
 from .plugins import TOOLS_REGISTRY
-import json
+from .plugins.runner import on_idle
+from .changes import publish, publish_progress
 import redis as redislib
+from celery import chord
 from .celery_app import celery
 from .config import settings
 
 r = redislib.from_url(settings.REDIS_URL, decode_responses=True)
 
-# Task principal: usa r inicializado y save_findings
+def _stop_requested(scan_id: int) -> bool:
+    try:
+        return r.get(f"scan:{scan_id}:stop") == "1"
+    except Exception:
+        return False
+
+def _tool_status(scan_id: int, tool_id: str, status: str) -> None:
+    try:
+        r.hset(f"scan:{scan_id}:tools", tool_id, status)
+        r.expire(f"scan:{scan_id}:tools", 86400)
+    except Exception:
+        pass
+    publish_progress(scan_id, tools={tool_id: status})
+
+# Task principal: marca el scan en curso y reparte las herramientas
 @celery.task(name="app.tasks.run_scan")
-def run_scan(scan_id: int, target: str, tools: list[str]):
+def run_scan(scan_id: int, target: str, tools: list[str], force_refresh: bool = False):
     db = SessionLocal()
+    dispatched = False
     try:
         scan = db.query(Scan).get(scan_id)
         if not scan:
             return
         try:
             r.set(f"scan:{scan_id}:task", run_scan.request.id)
+            r.delete(f"scan:{scan_id}:tools")
         except Exception:
             pass
 
         scan.status = "running"
         db.commit()
+        try:
+            prepare_diff(db, scan)
+        except Exception:
+            db.rollback()
 
-        all_findings = []
-        for tool_id in tools:
-            if r.get(f"scan:{scan_id}:stop") == "1":
-                scan.status = "stopped"
-                scan.finished_at = datetime.utcnow()
-                db.commit()
-                break
+        tool_ids = [t for t in tools if t in TOOLS_REGISTRY]
+        for tool_id in tool_ids:
+            _tool_status(scan_id, tool_id, "queued")
 
-            tool = TOOLS_REGISTRY.get(tool_id)
-            if not tool:
-                continue
+        if settings.SCAN_PARALLEL and len(tool_ids) > 1:
+            # Modo paralelo: una subtarea por herramienta y finalize_scan agrega al terminar todas
+            chord([run_tool.s(scan_id, target, tool_id, force_refresh) for tool_id in tool_ids])(finalize_scan.s(scan_id))
+            dispatched = True
+            return {"dispatched": tool_ids}
 
+        results = []
+        for tool_id in tool_ids:
+            res = run_tool(scan_id, target, tool_id, force_refresh)
+            results.append(res)
+            if res.get("status") == "stopped":
+                break
+        return finalize_scan(results, scan_id)
+    except Exception as e:
+        scan = db.query(Scan).get(scan_id)
+        if scan:
+            scan.status = "error"
+            db.commit()
+        scan_log(scan_id, f"ERROR: {e}")
+        return {"error": str(e)}
+    finally:
+        # En modo paralelo la clave la limpia finalize_scan
+        if not dispatched:
             try:
-                r.publish(f"scan:{scan_id}:logs", f"== Ejecutando {tool.name} ==")
+                r.delete(f"scan:{scan_id}:task")
             except Exception:
                 pass
+        flush_scan_log(scan_id)
+        db.close()
 
-            findings = tool.run(target, scan_id)
-            save_findings(db, scan, findings)
-            all_findings.extend(findings)
+def _tool_items(tool, target: str, scan_id: int, cancel, force_refresh: bool = False, announce: bool = True):
+    """Hallazgos de una herramienta sobre un objetivo, servidos desde la caché o rellenándola."""
+    use_cache = tool_cache.enabled_for(tool)
+    cached = tool_cache.get(tool, target) if use_cache and not force_refresh else None
+    t0, status = time.perf_counter(), "error"
+    try:
+        if cached is not None:
+            if announce:
+                scan_log(scan_id, f"== {tool.name}: resultados en caché ({len(cached)}) ==")
+            yield from cached
+        else:
+            if announce:
+                scan_log(scan_id, f"== Ejecutando {tool.name} ==")
+            record = [] if use_cache else None
+            for item in tool.iter_findings(target, scan_id, cancel):
+                yield item
+                if record is not None:
+                    record.append(item)
+                    if len(record) > settings.TOOL_CACHE_MAX_ITEMS or item.get("category") == "error":
+                        record = None
+            # Solo se cachean ejecuciones completas, sin errores y con resultados: una ejecución vacía
+            # puede deberse a un binario ausente o a un fallo silencioso y no debe fijarse durante el TTL
+            if record and not cancel.cancelled:
+                tool_cache.put(tool, target, record)
+        status = "stopped" if cancel.cancelled else "completed"
+    finally:
+        TOOL_RUN_SECONDS.labels(tool=tool.id, source="cache" if cached is not None else "run",
+                                status=status).observe(time.perf_counter() - t0)
+
+@celery.task(name="app.tasks.run_tool")
+def run_tool(scan_id: int, target: str, tool_id: str, force_refresh: bool = False):
+    with cancel_token(scan_id) as cancel:
+        if cancel.cancelled:
+            _tool_status(scan_id, tool_id, "stopped")
+            return {"tool": tool_id, "status": "stopped", "count": 0}
+
+        tool = TOOLS_REGISTRY.get(tool_id)
+        db = SessionLocal()
+        try:
+            scan = db.query(Scan).get(scan_id)
+            if not scan or not tool:
+                return {"tool": tool_id, "status": "skipped", "count": 0}
+
+            _tool_status(scan_id, tool_id, "running")
+            # Los hallazgos llegan en streaming y se vuelcan por lotes
+            with FindingsIngestor(db, scan) as ingest, on_idle(ingest.tick):
+                for item in _tool_items(tool, target, scan_id, cancel, force_refresh):
+                    ingest.add(item)
+
+            status = "stopped" if cancel.cancelled else "completed"
+            _tool_status(scan_id, tool_id, status)
+            return {"tool": tool_id, "status": status, "count": ingest.count}
+        except Exception as e:
+            db.rollback()
+            _tool_status(scan_id, tool_id, "error")
+            scan_log(scan_id, f"ERROR: [{tool_id}] {e}")
+            return {"tool": tool_id, "status": "error", "count": 0, "error": str(e)}
+        finally:
+            flush_scan_log(scan_id)
+            db.close()
+
+# Agregación final: decide completed/stopped/error a partir del resultado de cada herramienta
+@celery.task(name="app.tasks.finalize_scan")
+def finalize_scan(results: list[dict], scan_id: int):
+    db = SessionLocal()
+    try:
+        scan = db.query(Scan).get(scan_id)
+        if not scan:
+            return
+        results = [res for res in (results or []) if res]
+        total = sum(res.get("count", 0) for res in results)
+        statuses = {res.get("status") for res in results}
 
-        if scan.status != "stopped":
+        if scan.status == "stopped" or "stopped" in statuses or _stop_requested(scan_id):
+            scan.status = "stopped"
+        elif "error" in statuses:
+            scan.status = "error"
+        else:
             scan.status = "completed"
-            scan.finished_at = datetime.utcnow()
-            db.commit()
-            try:
-                r.publish(f"scan:{scan_id}:logs", f"== Escaneo finalizado. Hallazgos: {len(all_findings)} ==")
-            except Exception:
-                pass
+        scan.finished_at = datetime.utcnow()
+        db.commit()
+        try:
+            finalize_diff(db, scan)
+        except Exception:
+            db.rollback()
+
+        if scan.status == "completed":
+            scan_log(scan_id, f"== Escaneo finalizado. Hallazgos: {total} ==")
+        return {"count": total, "status": scan.status}
+    finally:
+        try:
+            r.delete(f"scan:{scan_id}:task", _queue_key(scan_id))
+        except Exception:
+            pass
+        flush_scan_log(scan_id)
+        db.close()
+
+# Scans masivos: los objetivos van a una cola en Redis y un número fijo de carriles la consume
+# por lotes, de modo que el coste de encolado no crece con la lista de objetivos.
+def _queue_key(scan_id: int) -> str:
+    return f"scan:{scan_id}:queue"
+
+def _progress_key(scan_id: int) -> str:
+    return f"scan:{scan_id}:progress"
+
+def _take_shard(scan_id: int, size: int) -> list[str]:
+    # LRANGE + LTRIM en MULTI: cada lote lo recibe un único carril
+    pipe = r.pipeline(transaction=True)
+    pipe.lrange(_queue_key(scan_id), 0, size - 1)
+    pipe.ltrim(_queue_key(scan_id), size, -1)
+    shard, _ = pipe.execute()
+    return shard
+
+def _bump_progress(scan_id: int, done: int, findings: int, errors: int) -> None:
+    try:
+        pipe = r.pipeline(transaction=False)
+        pipe.hincrby(_progress_key(scan_id), "done", done)
+        pipe.hincrby(_progress_key(scan_id), "findings", findings)
+        if errors:
+            pipe.hincrby(_progress_key(scan_id), "errors", errors)
+        totals = pipe.execute()
+    except Exception:
+        return
+    publish_progress(scan_id, done=totals[0], findings=totals[1])
+
+@celery.task(name="app.tasks.run_bulk_scan")
+def run_bulk_scan(scan_id: int, tools: list[str], force_refresh: bool = False):
+    db = SessionLocal()
+    dispatched = False
+    try:
+        scan = db.query(Scan).get(scan_id)
+        if not scan:
+            return
+        targets = list(scan.targets or [])
+        try:
+            r.set(f"scan:{scan_id}:task", run_bulk_scan.request.id)
+        except Exception:
+            pass
+
+        scan.status = "running"
+        db.commit()
+        try:
+            prepare_diff(db, scan)
+        except Exception:
+            db.rollback()
 
-        return {"count": len(all_findings)}
+        tool_ids = [t for t in tools if t in TOOLS_REGISTRY]
+        queue, progress = _queue_key(scan_id), _progress_key(scan_id)
+        pipe = r.pipeline(transaction=False)
+        pipe.delete(queue, progress)
+        for i in range(0, len(targets), 1000):
+            pipe.rpush(queue, *targets[i:i + 1000])
+        pipe.expire(queue, 86400)
+        pipe.hset(progress, mapping={"total": len(targets), "done": 0, "findings": 0, "errors": 0, "started_at": time.time()})
+        pipe.expire(progress, settings.LOG_STREAM_TTL)
+        pipe.execute()
+
+        if not targets or not tool_ids:
+            return finalize_scan([], scan_id)
+        lanes = max(1, min(settings.BULK_LANES, math.ceil(len(targets) / max(1, settings.BULK_SHARD_SIZE))))
+        scan_log(scan_id, f"== Escaneo masivo: {len(targets)} objetivos en {lanes} carriles ==")
+        chord([run_bulk_lane.s(scan_id, tool_ids, force_refresh) for _ in range(lanes)])(finalize_scan.s(scan_id))
+        dispatched = True
+        return {"dispatched": lanes}
     except Exception as e:
+        db.rollback()
         scan = db.query(Scan).get(scan_id)
         if scan:
             scan.status = "error"
             db.commit()
-        try:
-            r.publish(f"scan:{scan_id}:logs", f"ERROR: {e}")
-        except Exception:
-            pass
+        scan_log(scan_id, f"ERROR: {e}")
         return {"error": str(e)}
     finally:
+        if not dispatched:
+            try:
+                r.delete(f"scan:{scan_id}:task")
+            except Exception:
+                pass
+        flush_scan_log(scan_id)
+        db.close()
+
+@celery.task(name="app.tasks.run_bulk_lane")
+def run_bulk_lane(scan_id: int, tool_ids: list[str], force_refresh: bool = False):
+    tools = [TOOLS_REGISTRY[t] for t in tool_ids if t in TOOLS_REGISTRY]
+    # Las herramientas con lotes (APIs HTTP) reciben el shard entero en una llamada; el resto, objetivo a objetivo
+    batched = [t for t in tools if t.batch]
+    tools = [t for t in tools if not t.batch]
+    with cancel_token(scan_id) as cancel:
+        db = SessionLocal()
         try:
-            r.delete(f"scan:{scan_id}:task")
+            scan = db.query(Scan).get(scan_id)
+            if not scan:
+                return {"tool": "bulk", "status": "skipped", "count": 0}
+            # Un único ingestor por carril: los lotes de inserción agrupan hallazgos de varios objetivos
+            with FindingsIngestor(db, scan) as ingest, on_idle(ingest.tick):
+                while not cancel.cancelled:
+                    shard = _take_shard(scan_id, max(1, settings.BULK_SHARD_SIZE))
+                    if not shard:
+                        break
+                    found, failed = Counter(), set()
+                    for tool in batched:
+                        try:
+                            for target, item in tool.iter_batch(shard, scan_id, cancel):
+                                ingest.add({**item, "meta": {**(item.get("meta") or {}), "target": target}})
+                                found[target] += 1
+                        except Exception as e:
+                            failed.update(shard)
+                            scan_log(scan_id, f"ERROR: [{tool.id}] lote de {len(shard)} objetivos: {e}")
+                    for target in shard:
+                        if cancel.cancelled:
+                            break
+                        for tool in tools:
+                            try:
+                                for item in _tool_items(tool, target, scan_id, cancel, force_refresh, announce=False):
+                                    ingest.add({**item, "meta": {**(item.get("meta") or {}), "target": target}})
+                                    found[target] += 1
+                            except Exception as e:
+                                failed.add(target)
+                                scan_log(scan_id, f"ERROR: [{tool.id}] {target}: {e}")
+                        _bump_progress(scan_id, 1, found[target], int(target in failed))
+            status = "stopped" if cancel.cancelled else "completed"
+            return {"tool": "bulk", "status": status, "count": ingest.count}
+        except Exception as e:
+            db.rollback()
+            scan_log(scan_id, f"ERROR: {e}")
+            return {"tool": "bulk", "status": "error", "count": 0, "error": str(e)}
+        finally:
+            flush_scan_log(scan_id)
+            db.close()
+
+def enqueue_scan(scan: Scan, force_refresh: bool = False):
+    if scan.kind == "bulk":
+        return run_bulk_scan.delay(scan.id, scan.tools, force_refresh)
+    return run_scan.delay(scan.id, scan.target, scan.tools, force_refresh)
+
+@celery.task(name="app.tasks.render_report")
+def render_report(scan_id: int, version: str):
+    try:
+        with timer(EXPORT_SECONDS, format="pdf"):
+            path = render_pdf_report(scan_id, version)
+        return {"path": path}
+    finally:
+        try:
+            r.delete(f"report:{scan_id}:{version}:job")
         except Exception:
             pass
-        db.close()
+
+def enqueue_report(scan_id: int, version: str) -> bool:
+    # Un único render en curso por (scan, versión)
+    try:
+        if not r.set(f"report:{scan_id}:{version}:job", "1", nx=True, ex=900):
+            return False
+    except Exception:
+        pass
+    render_report.delay(scan_id, version)
+    return True
 
 @celery.task(name="app.tasks.run_scheduled_scan")
-def run_scheduled_scan(project_id: int | None, target: str, tools: list[str]):
+def run_scheduled_scan(project_id: int | None, target: str, tools: list[str], schedule_id: int | None = None):
     db = SessionLocal()
     try:
-        scan = Scan(target=target, status="pending", tools=tools, project_id=project_id)
+        scan = Scan(target=target, status="pending", tools=tools, project_id=project_id, schedule_id=schedule_id)
         db.add(scan)
         db.commit()
         run_scan.delay(scan.id, target, tools)
@@ -87,40 +362,117 @@ def run_scheduled_scan(project_id: int | None, target: str, tools: list[str]):
     finally:
         db.close()
 
-# Función utilitaria para persistir hallazgos
-def save_findings(db: Session, scan: Scan, findings: list[dict]) -> None:
-    if not findings:
-        return
-    objs = []
-    for item in findings:
-        objs.append(Finding(
-            scan_id=scan.id,
-            tool=item.get("tool", "unknown"),
-            category=item.get("category", "info"),
-            value=str(item.get("value", "")),
-            severity=item.get("severity", "info"),
-            meta=item.get("meta", {}),
-            raw=(json.dumps(item["raw"]) if item.get("raw") is not None else None),
-        ))
-    db.add_all(objs)
-    db.commit()
-
 from datetime import timedelta
-from .models import Schedule
+import random
+from sqlalchemy import func, update
+from .models import ACTIVE_STATUSES, Schedule
+
+def _active_scan_counts(db: Session) -> tuple[dict, dict]:
+    # Scans en vuelo por proyecto y por objetivo: una sola consulta por tick sobre idx_scans_status
+    per_project: dict = {}
+    per_target: dict = {}
+    rows = (
+        db.query(Scan.project_id, Scan.target, func.count(Scan.id))
+        .filter(Scan.status.in_(ACTIVE_STATUSES), Scan.deleted_at.is_(None))
+        .group_by(Scan.project_id, Scan.target)
+        .all()
+    )
+    for project_id, target, n in rows:
+        per_project[project_id] = per_project.get(project_id, 0) + n
+        per_target[target] = per_target.get(target, 0) + n
+    return per_project, per_target
+
+def _over_cap(count: int, cap: int) -> bool:
+    return cap > 0 and count >= cap
 
 @celery.task(name="app.tasks.tick_schedules")
 def tick_schedules():
+    """Despacha los schedules vencidos por lotes.
+
+    Cada lote se reclama con SELECT ... FOR UPDATE SKIP LOCKED (varias instancias de beat no
+    despachan dos veces la misma fila) y su next_run_at se actualiza en un único executemany.
+    El tick procesa como máximo SCHEDULE_MAX_PER_TICK filas; lo que exceda los límites de
+    concurrencia por proyecto/objetivo se aplaza SCHEDULE_DEFER_SECONDS.
+    """
     db = SessionLocal()
     try:
         now = datetime.utcnow()
-        due = db.query(Schedule).filter(Schedule.enabled == True, Schedule.next_run_at <= now).all()
-        for s in due:
-            s.last_run_at = now
-            s.next_run_at = now + timedelta(minutes=max(1, s.interval_minutes))
+        per_project, per_target = _active_scan_counts(db)
+        processed = 0
+        while processed < settings.SCHEDULE_MAX_PER_TICK:
+            batch = (
+                db.query(Schedule.id, Schedule.project_id, Schedule.target, Schedule.tools, Schedule.interval_minutes)
+                .filter(Schedule.enabled == True, Schedule.next_run_at <= now)
+                .order_by(Schedule.next_run_at)
+                .limit(min(settings.SCHEDULE_BATCH_SIZE, settings.SCHEDULE_MAX_PER_TICK - processed))
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+            if not batch:
+                break
+            updates, launch = [], []
+            for sid, project_id, target, tools, interval in batch:
+                jitter = timedelta(seconds=random.uniform(0, settings.SCHEDULE_JITTER_SECONDS))
+                if (_over_cap(per_project.get(project_id, 0), settings.SCHEDULE_MAX_ACTIVE_PER_PROJECT)
+                        or _over_cap(per_target.get(target, 0), settings.SCHEDULE_MAX_ACTIVE_PER_TARGET)):
+                    updates.append({"id": sid, "next_run_at": now + timedelta(seconds=settings.SCHEDULE_DEFER_SECONDS) + jitter})
+                    continue
+                per_project[project_id] = per_project.get(project_id, 0) + 1
+                per_target[target] = per_target.get(target, 0) + 1
+                updates.append({"id": sid, "last_run_at": now, "next_run_at": now + timedelta(minutes=max(1, interval)) + jitter})
+                launch.append((project_id, target, tools, sid))
+            db.execute(update(Schedule), updates)
             db.commit()
-            try:
-                run_scheduled_scan.delay(s.project_id, s.target, s.tools)
-            except Exception:
-                pass
+            # El UPDATE masivo no pasa por los hooks de sesión: publicar los cambios a mano
+            publish("schedules", updates)
+            processed += len(batch)
+            for project_id, target, tools, sid in launch:
+                try:
+                    run_scheduled_scan.delay(project_id, target, tools, sid)
+                except Exception:
+                    pass
+        return {"processed": processed}
+    finally:
+        db.close()
+
+from . import summary
+
+@celery.task(name="app.tasks.rebuild_summary")
+def rebuild_summary():
+    # Corrige la deriva de los contadores del resumen (p.ej. escrituras perdidas si Redis cayó)
+    db = SessionLocal()
+    try:
+        summary.rebuild(db)
+        return {"ok": True}
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+from . import purge
+
+@celery.task(name="app.tasks.purge_deleted", bind=True, max_retries=None)
+def purge_deleted(self, job_id: str, kind: str, target_id: int):
+    db = SessionLocal()
+    try:
+        res = purge.purge(db, job_id, kind, target_id)
+    finally:
+        db.close()
+    if res.get("status") == "waiting":
+        raise self.retry(countdown=purge.WAIT_RETRY_SECONDS)
+    return res
+
+def enqueue_purge(kind: str, target_id: int) -> str:
+    job_id = purge.new_job(kind, target_id)
+    purge_deleted.apply_async(args=[job_id, kind, target_id], task_id=job_id)
+    return job_id
+
+@celery.task(name="app.tasks.sweep_deleted")
+def sweep_deleted():
+    # Reintenta las purgas de borrados antiguos que no llegaron a completarse
+    db = SessionLocal()
+    try:
+        pending = purge.pending_purges(db)
+    finally:
+        db.close()
+    for kind, target_id in pending:
+        enqueue_purge(kind, target_id)
+    return {"enqueued": len(pending)}
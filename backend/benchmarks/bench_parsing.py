@@ -0,0 +1,119 @@
+"""Micro-benchmark de parseo: heurística anterior de theHarvester frente a app.plugins.parsing.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_parsing --lines 200000
+    python -m benchmarks.bench_parsing --lines 1000000 --junk 0.8
+
+Genera salidas sintéticas (stdout con banners/logs, fichero JSON de theHarvester y líneas JSON de
+subfinder) e imprime líneas/segundo y filas que llegarían a `findings` con cada variante.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from app.plugins.parsing import Normalizer
+from app.plugins.theharvester import TheHarvesterTool
+
+TARGET = "bench.example.com"
+JUNK = [
+    "*******************************************************************",
+    "* theHarvester 4.4.3                                              *",
+    "* Coded by Christian Martorella                                   *",
+    "[*] Target: bench.example.com",
+    "[*] Searching Bing. ",
+    "Searching 0 results.",
+    "[*] No IPs found.",
+    "Read proxies.yaml from /etc/theHarvester/proxies.yaml",
+    "An exception has occurred: HTTPSConnectionPool(host='api.x.com', port=443)",
+    "[*] Hosts found: 1234",
+    "---------------------",
+    "version 1.2.3 loaded config.yaml",
+]
+
+
+def synthetic_stdout(n: int, junk_ratio: float, rnd: random.Random) -> list[str]:
+    lines = []
+    for i in range(n):
+        roll = rnd.random()
+        if roll < junk_ratio:
+            lines.append(rnd.choice(JUNK))
+        elif roll < junk_ratio + (1 - junk_ratio) / 3:
+            lines.append(f"user{i % 5000}@{TARGET}")
+        elif roll < junk_ratio + 2 * (1 - junk_ratio) / 3:
+            lines.append(f"h{i % 20000}.{TARGET}:10.0.{i % 256}.{i % 200}")
+        else:
+            lines.append(f"h{i % 20000}.other-domain.net")  # fuera de alcance
+    return lines
+
+
+def legacy_parse(lines):
+    # Clasificación anterior de TheHarvesterTool: "@" y "." => email; "." sin espacios => host
+    out = []
+    for line in lines:
+        l = line.strip()
+        if "@" in l and "." in l:
+            out.append(("email", l))
+        elif "." in l and " " not in l:
+            out.append(("host", l))
+    return out
+
+
+def shared_parse(lines):
+    norm = Normalizer(TARGET)
+    out = []
+    for line in lines:
+        out.extend(norm.scan_line(line))
+    return out
+
+
+def run_case(label, fn, arg, n_lines):
+    t0 = time.perf_counter()
+    rows = fn(arg)
+    elapsed = time.perf_counter() - t0
+    print(f"{label:<30} {len(rows):>9} filas  {elapsed:8.3f}s  {n_lines / elapsed:>12,.0f} líneas/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=200000)
+    parser.add_argument("--junk", type=float, default=0.5, help="proporción de líneas de banner/log")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    rnd = random.Random(args.seed)
+
+    lines = synthetic_stdout(args.lines, args.junk, rnd)
+    print(f"stdout sintético: {len(lines)} líneas ({args.junk:.0%} ruido)")
+    run_case("stdout heurística anterior", legacy_parse, lines, len(lines))
+    run_case("stdout Normalizer.scan_line", shared_parse, lines, len(lines))
+
+    # Fichero estructurado de theHarvester (-f): el camino que usa ahora el plugin
+    hosts = [f"h{i}.{TARGET}:10.0.{i % 256}.{i % 200}" for i in range(args.lines // 2)]
+    emails = [f"user{i}@{TARGET}" for i in range(args.lines // 4)]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "result.json")
+        with open(path, "w") as fh:
+            json.dump({"hosts": hosts, "emails": emails, "ips": []}, fh)
+        tool = TheHarvesterTool()
+
+        def from_json(p):
+            norm = Normalizer(TARGET)
+            validate = {"email": norm.email, "host": norm.host, "ip": norm.ip}
+            return [v for kind, value in tool._from_json(p) if (v := validate[kind](value))]
+
+        run_case("theHarvester JSON (-f)", from_json, path, len(hosts) + len(emails))
+
+    # Líneas JSON de subfinder: validación + alcance + deduplicación por host
+    sub = [json.dumps({"host": f"H{i % (args.lines // 2)}.{TARGET}.", "source": "crtsh"}) for i in range(args.lines)]
+
+    def subfinder(items):
+        norm = Normalizer(TARGET)
+        return [h for line in items if (h := norm.host(json.loads(line).get("host")))]
+
+    run_case("subfinder JSON normalizado", subfinder, sub, len(sub))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Benchmark de serialización de listados: ORM + Pydantic (camino anterior) frente a tuplas + orjson.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_serialize --redis fake
+    python -m benchmarks.bench_serialize --redis fake --rows 10000 --rows 100000 --repeat 5
+
+Siembra un scan con el mayor número de --rows hallazgos en una SQLite temporal (o --database-url) y,
+para cada tamaño, mide consulta + serialización a bytes JSON:
+  orm+pydantic   objetos ORM validados con FindingOut (from_attributes) y codificados con json, como
+                 hacía FastAPI con response_model
+  tuplas+orjson  select de las columnas del schema, dicts y orjson (listados acotados)
+  stream+orjson  array JSON por particiones desde AsyncSession.stream (listados sin límite)
+Comprueba que las tres variantes producen el mismo JSON.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.suite import TARGET, use_fake_redis
+
+
+def _best(fn, repeat):
+    best, out = None, None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, action="append", help="filas por respuesta (repetible; por defecto 10000 y 100000)")
+    parser.add_argument("--repeat", type=int, default=3, help="repeticiones por variante (se toma la mejor)")
+    parser.add_argument("--database-url", default=os.getenv("BENCH_DATABASE_URL"))
+    parser.add_argument("--redis", default=os.getenv("BENCH_REDIS_URL", os.getenv("REDIS_URL", "redis://localhost:6379/15")),
+                        help='URL de Redis o "fake" (fakeredis en memoria)')
+    opts = parser.parse_args()
+    sizes = sorted(opts.rows or [10000, 100000])
+
+    tmp = tempfile.mkdtemp(prefix="osint-serialize-")
+    os.environ["DATABASE_URL"] = opts.database_url or f"sqlite:///{tmp}/bench.db"
+    if opts.redis == "fake":
+        use_fake_redis()
+    else:
+        os.environ["REDIS_URL"] = opts.redis
+
+    from pydantic import TypeAdapter
+    from sqlalchemy import select
+    import app.models  # noqa: F401
+    from app.db import SessionLocal, ensure_schema
+    from app.ingest import save_findings
+    from app.models import Finding, Scan
+    from app.schemas import FindingOut
+    from app.serialize import _iter_array, columns_for, dumps, row_dicts
+
+    ensure_schema()
+    db = SessionLocal()
+    scan = Scan(target=TARGET, status="completed", tools=["subfinder"])
+    db.add(scan)
+    db.commit()
+    save_findings(db, scan, [{"tool": "subfinder", "category": "subdomain", "value": f"h{i}.{TARGET}", "severity": "info",
+                              "meta": {"source": "crtsh", "ip": f"10.0.{i // 256 % 256}.{i % 256}"},
+                              "raw": {"host": f"h{i}.{TARGET}", "input": TARGET, "source": "crtsh"}}
+                             for i in range(sizes[-1])])
+    scan_id = scan.id
+    adapter = TypeAdapter(list[FindingOut])
+
+    def orm_pydantic(n):
+        items = db.query(Finding).filter(Finding.scan_id == scan_id).order_by(Finding.id).limit(n).all()
+        content = adapter.dump_python(adapter.validate_python(items), mode="json")
+        body = json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+        db.expunge_all()
+        return body
+
+    def tuples_orjson(n):
+        stmt = (select(*columns_for(Finding, FindingOut)).where(Finding.scan_id == scan_id)
+                .order_by(Finding.id).limit(n))
+        return dumps(row_dicts(FindingOut, db.execute(stmt)))
+
+    def stream_orjson(n):
+        stmt = (select(*columns_for(Finding, FindingOut)).where(Finding.scan_id == scan_id)
+                .order_by(Finding.id).limit(n))
+
+        async def collect():
+            return b"".join([chunk async for chunk in _iter_array(stmt, tuple(FindingOut.model_fields))])
+
+        return asyncio.run(collect())
+
+    print(f"{'filas':>8} {'variante':<15} {'segundos':>9} {'filas/s':>12} {'MB':>7} {'x':>6}")
+    for n in sizes:
+        base = None
+        reference = None
+        for label, fn in (("orm+pydantic", orm_pydantic), ("tuplas+orjson", tuples_orjson), ("stream+orjson", stream_orjson)):
+            elapsed, body = _best(lambda: fn(n), opts.repeat)
+            parsed = json.loads(body)
+            if reference is None:
+                reference = parsed
+            elif parsed != reference:
+                sys.exit(f"{label}: el JSON no coincide con orm+pydantic")
+            base = base or elapsed
+            print(f"{n:>8} {label:<15} {elapsed:>9.3f} {n / elapsed:>12,.0f} {len(body) / 1e6:>7.2f} {base / elapsed:>6.1f}")
+    db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+"""Sustituto determinista de subfinder/amass/theHarvester para los benchmarks.
+
+Uso: python fake_tool.py <subfinder|amass|theHarvester> [argumentos de la herramienta real]
+
+Variables de entorno:
+    FAKE_TOOL_LINES  líneas (hallazgos) a emitir por ejecución (por defecto 1000)
+    FAKE_TOOL_RATE   líneas por segundo; 0 = tan rápido como sea posible (por defecto 0)
+
+La salida depende solo del dominio y de FAKE_TOOL_LINES, así que dos ejecuciones son idénticas.
+"""
+import json
+import os
+import sys
+import time
+
+SOURCES = ["crtsh", "alienvault", "hackertarget", "rapiddns", "dnsdumpster"]
+
+
+def _arg(argv, flag, default=None):
+    return argv[argv.index(flag) + 1] if flag in argv and argv.index(flag) + 1 < len(argv) else default
+
+
+def _paced(n, rate):
+    start = time.perf_counter()
+    for i in range(n):
+        if rate > 0:
+            delay = start + i / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        yield i
+
+
+def main():
+    tool, argv = sys.argv[1], sys.argv[2:]
+    n = int(os.getenv("FAKE_TOOL_LINES", "1000"))
+    rate = float(os.getenv("FAKE_TOOL_RATE", "0"))
+    domain = _arg(argv, "-d", "bench.example.com")
+    out = sys.stdout
+
+    if tool == "subfinder":
+        for i in _paced(n, rate):
+            out.write(json.dumps({"host": f"s{i}.{domain}", "input": domain, "source": SOURCES[i % len(SOURCES)]}) + "\n")
+    elif tool == "amass":
+        for i in _paced(n, rate):
+            out.write(json.dumps({"name": f"a{i}.{domain}", "domain": domain,
+                                  "addresses": [{"ip": f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}"}],
+                                  "sources": [SOURCES[i % len(SOURCES)]]}) + "\n")
+    elif tool == "theHarvester":
+        # Banner y progreso por stdout; resultados en el fichero de -f, como la herramienta real
+        out.write("*" * 60 + "\n* theHarvester (fake)\n" + "*" * 60 + "\n")
+        hosts, emails = [], []
+        for i in _paced(n, rate):
+            if i % 4 == 0:
+                emails.append(f"user{i}@{domain}")
+            else:
+                hosts.append(f"t{i}.{domain}:10.1.{i // 256 % 256}.{i % 256}")
+            if i % 500 == 0:
+                out.write(f"[*] Searching source {SOURCES[i % len(SOURCES)]}...\n")
+        path = _arg(argv, "-f")
+        if path:
+            with open(path + ".json", "w") as fh:
+                json.dump({"hosts": hosts, "emails": emails, "ips": []}, fh)
+    else:
+        sys.exit(f"herramienta desconocida: {tool}")
+    out.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""Prueba de carga de los endpoints de lectura calientes de la API (latencias p50/p95/p99).
+
+Uso (desde backend/):
+    python -m benchmarks.load_api --redis fake                     # API local en un proceso hijo (SQLite temporal)
+    python -m benchmarks.load_api --redis fake --export-clients 8  # con exportaciones CSV lentas en paralelo
+    python -m benchmarks.load_api --url http://localhost:8000 --scan-id 42 --concurrency 200 --duration 30
+
+Sin --url siembra una BD temporal (o --database-url) con un scan de --rows hallazgos y levanta uvicorn
+en un proceso hijo. Lanza --concurrency clientes que recorren los listados de scans, schedules y
+hallazgos durante --duration segundos; --export-clients añade descargas CSV completas simultáneas,
+el caso en que los endpoints síncronos se quedaban sin hilos del threadpool. Para comparar dos
+versiones, ejecutar el mismo comando sobre cada una.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import queue
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.suite import TARGET, use_fake_redis
+
+PATHS = [
+    "/api/scans?limit=100",
+    "/api/schedules",
+    "/api/scans/{scan_id}/findings?limit=200",
+    "/api/scans/{scan_id}/findings?limit=200&prefix=h1",
+    "/api/scans/{scan_id}/findings/count",
+]
+
+
+def _serve(opts, port, ready):
+    if opts.redis == "fake":
+        use_fake_redis()
+    else:
+        os.environ["REDIS_URL"] = opts.redis
+    import uvicorn
+    import app.models  # noqa: F401
+    from app.db import SessionLocal, ensure_schema
+    from app.ingest import save_findings
+    from app.models import Project, Scan, Schedule
+    from app.main import app
+    from datetime import datetime, timedelta
+
+    ensure_schema()
+    db = SessionLocal()
+    project = Project(name="load")
+    db.add(project)
+    db.commit()
+    scan_id = None
+    for i in range(opts.scans):
+        scan = Scan(target=f"s{i}.{TARGET}", status="completed", tools=["subfinder"], project_id=project.id)
+        db.add(scan)
+        db.commit()
+        scan_id = scan.id
+    rows = [{"tool": "subfinder", "category": "subdomain", "value": f"h{i}.{TARGET}", "severity": "info",
+             "meta": {"source": "crtsh"}} for i in range(opts.rows)]
+    save_findings(db, db.get(Scan, scan_id), rows)
+    for i in range(opts.schedules):
+        db.add(Schedule(project_id=project.id, target=f"s{i}.{TARGET}", tools=["subfinder"], interval_minutes=60,
+                        enabled=True, next_run_at=datetime.utcnow() + timedelta(hours=1)))
+    db.commit()
+    db.close()
+    ready.put(scan_id)
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+async def _load(base, scan_id, opts):
+    paths = [p.format(scan_id=scan_id) for p in PATHS]
+    latencies = {p: [] for p in paths}
+    errors = {p: 0 for p in paths}
+    deadline = time.perf_counter() + opts.duration
+    limits = httpx.Limits(max_connections=opts.concurrency + opts.export_clients, max_keepalive_connections=opts.concurrency)
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=opts.timeout) as client:
+
+        async def reader(n):
+            i = n
+            while time.perf_counter() < deadline:
+                path = paths[i % len(paths)]
+                i += 1
+                t0 = time.perf_counter()
+                try:
+                    resp = await client.get(path)
+                    ok = resp.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    latencies[path].append(time.perf_counter() - t0)
+                else:
+                    errors[path] += 1
+
+        async def exporter():
+            exports = 0
+            while time.perf_counter() < deadline:
+                try:
+                    async with client.stream("GET", f"/api/exports/{scan_id}.csv") as resp:
+                        async for _ in resp.aiter_bytes():
+                            pass
+                    exports += 1
+                except httpx.HTTPError:
+                    pass
+            return exports
+
+        t0 = time.perf_counter()
+        results = await asyncio.gather(*(reader(n) for n in range(opts.concurrency)),
+                                       *(exporter() for _ in range(opts.export_clients)))
+        elapsed = time.perf_counter() - t0
+    return latencies, errors, sum(results[opts.concurrency:]), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="API ya desplegada (si no, se levanta una local)")
+    parser.add_argument("--scan-id", type=int, help="scan con hallazgos para los endpoints por scan (con --url)")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument("--export-clients", type=int, default=0, help="descargas CSV simultáneas de fondo")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--rows", type=int, default=50000, help="hallazgos del scan sembrado")
+    parser.add_argument("--scans", type=int, default=200)
+    parser.add_argument("--schedules", type=int, default=100)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--database-url", default=os.getenv("BENCH_DATABASE_URL"))
+    parser.add_argument("--redis", default=os.getenv("BENCH_REDIS_URL", os.getenv("REDIS_URL", "redis://localhost:6379/15")),
+                        help='URL de Redis o "fake" (fakeredis en memoria)')
+    opts = parser.parse_args()
+
+    server = None
+    if opts.url:
+        base, scan_id = opts.url.rstrip("/"), opts.scan_id or 1
+    else:
+        tmp = tempfile.mkdtemp(prefix="osint-load-")
+        os.environ["DATABASE_URL"] = opts.database_url or f"sqlite:///{tmp}/load.db"
+        os.environ.setdefault("REPORTS_DIR", os.path.join(tmp, "reports"))
+        ctx = multiprocessing.get_context("spawn")
+        ready = ctx.Queue()
+        server = ctx.Process(target=_serve, args=(opts, opts.port, ready), daemon=True)
+        server.start()
+        while True:
+            try:
+                scan_id = ready.get(timeout=1)
+                break
+            except queue.Empty:
+                if not server.is_alive():
+                    sys.exit("el proceso de la API terminó durante la preparación")
+        base = f"http://127.0.0.1:{opts.port}"
+        for _ in range(100):
+            try:
+                if httpx.get(f"{base}/health").status_code == 200:
+                    break
+            except httpx.HTTPError:
+                time.sleep(0.1)
+
+    try:
+        latencies, errors, exports, elapsed = asyncio.run(_load(base, scan_id, opts))
+    finally:
+        if server:
+            server.terminate()
+            server.join(5)
+
+    print(f"{opts.concurrency} clientes, {opts.export_clients} exportaciones de fondo, {elapsed:.1f}s")
+    print(f"{'endpoint':<48} {'ok':>7} {'err':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    total = 0
+    for path, values in latencies.items():
+        values.sort()
+        total += len(values)
+        print(f"{path:<48} {len(values):>7} {errors[path]:>5} {_percentile(values, 0.5) * 1000:>9.1f} "
+              f"{_percentile(values, 0.95) * 1000:>9.1f} {_percentile(values, 0.99) * 1000:>9.1f} "
+              f"{(values[-1] if values else 0) * 1000:>9.1f}")
+    every = sorted(v for values in latencies.values() for v in values)
+    print(f"{'total':<48} {total:>7} {sum(errors.values()):>5} {_percentile(every, 0.5) * 1000:>9.1f} "
+          f"{_percentile(every, 0.95) * 1000:>9.1f} {_percentile(every, 0.99) * 1000:>9.1f}  {total / elapsed:,.0f} req/s")
+    if opts.export_clients:
+        print(f"exportaciones CSV completadas: {exports}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
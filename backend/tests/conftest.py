@@ -0,0 +1,5 @@
+import os
+import tempfile
+
+# BD SQLite temporal por sesión de tests; se fija antes de importar app.config
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='osint-tests-')}/test.db")
@@ -0,0 +1,43 @@
+from sqlalchemy import func
+
+import app.models  # noqa: F401
+from app.db import SessionLocal, ensure_schema
+from app.ingest import FindingsIngestor
+from app.models import Finding, Scan
+from app.plugins.runner import on_idle, run_process
+
+
+def _stored(scan_id):
+    db = SessionLocal()
+    try:
+        return db.query(func.count(Finding.id)).filter(Finding.scan_id == scan_id).scalar()
+    finally:
+        db.close()
+
+
+def test_buffered_findings_flush_while_tool_is_silent():
+    ensure_schema()
+    db = SessionLocal()
+    scan = Scan(target="example.com", status="running", tools=["fake"])
+    db.add(scan)
+    db.commit()
+    seen_during_silence = None
+    # Una línea, silencio más largo que flush_seconds y una segunda línea
+    cmd = ["sh", "-c", "echo a.example.com; sleep 1.5; echo b.example.com"]
+    with FindingsIngestor(db, scan, batch_size=100, flush_seconds=0.3) as ingest, on_idle(ingest.tick):
+        for line in run_process(cmd, scan.id, max_concurrent=0):
+            if line.startswith("b."):
+                seen_during_silence = _stored(scan.id)
+            ingest.add({"tool": "fake", "category": "subdomain", "value": line})
+    assert seen_during_silence == 1
+    assert _stored(scan.id) == 2
+    db.close()
+
+
+def test_idle_hook_is_scoped_to_the_block():
+    calls = []
+    with on_idle(lambda: calls.append(1)):
+        list(run_process(["sh", "-c", "sleep 0.8"], max_concurrent=0))
+    after = len(calls)
+    list(run_process(["sh", "-c", "sleep 0.8"], max_concurrent=0))
+    assert after >= 1 and len(calls) == after
@@ -0,0 +1,21 @@
+from app.plugins import TOOLS_REGISTRY
+from app.routing import QUEUE_IO, QUEUE_SUBPROCESS, route_task
+
+
+def test_http_tools_are_registered_with_http_profile():
+    assert TOOLS_REGISTRY["hibp"].profile == "http"
+    assert TOOLS_REGISTRY["spiderfoot"].profile == "http"
+
+
+def test_http_tool_run_goes_to_io_queue():
+    assert route_task("app.tasks.run_tool", [1, "user@example.com", "hibp"], {}, {}) == {"queue": QUEUE_IO}
+    assert route_task("app.tasks.run_tool", [], {"scan_id": 1, "target": "example.com", "tool_id": "spiderfoot"}, {}) == {"queue": QUEUE_IO}
+
+
+def test_bulk_lane_with_only_http_tools_goes_to_io_queue():
+    assert route_task("app.tasks.run_bulk_lane", [1, ["hibp", "spiderfoot"]], {}, {}) == {"queue": QUEUE_IO}
+
+
+def test_mixed_profiles_go_to_subprocess_queue():
+    assert route_task("app.tasks.run_bulk_lane", [1, ["hibp", "subfinder"]], {}, {}) == {"queue": QUEUE_SUBPROCESS}
+    assert route_task("app.tasks.run_tool", [1, "example.com", "subfinder"], {}, {}) == {"queue": QUEUE_SUBPROCESS}
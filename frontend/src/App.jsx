@@ -13,10 +13,15 @@ export default function App() {
   const [tools, setTools] = useState(["subfinder","theharvester"]); // hibp para emails
   const [scans, setScans] = useState([]);
   const [findings, setFindings] = useState([]);
+  const [findingsScanId, setFindingsScanId] = useState(null);
+  const [findingsCursor, setFindingsCursor] = useState(null);
   const [schedules, setSchedules] = useState([]);
   const [scheduleInterval, setScheduleInterval] = useState(60);
   const [editingScheduleId, setEditingScheduleId] = useState(null);
   const [editingSchedule, setEditingSchedule] = useState(null);
+  const [summary, setSummary] = useState(null);
+  const [summaryTick, setSummaryTick] = useState(0);
+  const [scanProgress, setScanProgress] = useState({});
 
     const fmtDTLocal = (iso) => {
     const d = new Date(iso);
@@ -75,48 +80,88 @@ export default function App() {
     fetch(`${API}/api/projects`).then(r=>r.json()).then(setProjects);
   }, []); // carga inicial de proyectos
 
-  // Refresco de escaneos y schedules (único efecto)
+  // Aplica un parche del feed de cambios a una lista (por id; `deleted` elimina la fila).
+  // Las filas nuevas solo se añaden si pasan `accept` (p.ej. el filtro de proyecto activo)
+  const mergeChanges = (list, items, accept = () => true) => {
+    let out = list;
+    for (const item of items) {
+      if (item.deleted) { out = out.filter(x => x.id !== item.id); continue; }
+      const idx = out.findIndex(x => x.id === item.id);
+      if (idx >= 0) out = out.map(x => x.id === item.id ? { ...x, ...item } : x);
+      else if (accept(item)) out = [item, ...out];
+    }
+    return out;
+  };
+
+  // Escaneos y schedules: carga inicial y después cambios empujados por /ws/changes (sin polling)
   useEffect(() => {
     const ac = new AbortController();
     try { pendingController.current?.abort(); } catch {}
     pendingController.current = ac;
 
+    // Los listados llevan ETag: una recarga sin cambios se resuelve con un 304
     const load = () => {
-      fetchScans(selectedProject, ac.signal);
-      fetch(`${API}/api/schedules`).then(r=>r.json()).then(setSchedules);
+      fetchScans(selectedProject, ac.signal).catch(() => {});
+      fetch(`${API}/api/schedules`, { signal: ac.signal }).then(r=>r.json()).then(setSchedules).catch(() => {});
     };
-
-    // Consulta inicial (también cuando cambia selectedProject)
     load();
 
-    // Si autoRefresh está desactivado, no crear intervalos
     if (!autoRefresh) {
       return () => { try { pendingController.current?.abort(); } catch {} };
     }
 
-    // Intervalo cada 8s
-    const id = setInterval(() => {
-      const ac2 = new AbortController();
-      try { pendingController.current?.abort(); } catch {}
-      pendingController.current = ac2;
-
-      fetchScans(selectedProject, ac2.signal);
-      fetch(`${API}/api/schedules`).then(r=>r.json()).then(setSchedules);
-    }, 8000);
+    const wsUrl = (API.startsWith("http") ? API.replace(/^http/, "ws") : `ws://${location.hostname}:8000`) + "/ws/changes";
+    const inProject = (item) => !selectedProject || item.project_id === selectedProject;
+    let ws = null, retry = null, closed = false;
+    const connect = () => {
+      ws = new WebSocket(wsUrl);
+      ws.onmessage = (e) => {
+        const msg = JSON.parse(e.data);
+        // Entre la carga inicial (o una reconexión) y la suscripción se pudieron perder cambios:
+        // recarga condicional, un 304 si no hubo ninguno
+        if (msg.versions) { load(); return; }
+        if (msg.resync) { load(); setSummaryTick(t => t + 1); return; }
+        for (const ch of msg.changes || []) {
+          if (ch.kind === "scans") setScans(prev => mergeChanges(prev, ch.items, inProject));
+          else if (ch.kind === "schedules") setSchedules(prev => mergeChanges(prev, ch.items));
+          else if (ch.kind === "progress") setScanProgress(prev => {
+            const next = { ...prev };
+            for (const p of ch.items) next[p.id] = { ...next[p.id], ...p, tools: { ...next[p.id]?.tools, ...p.tools } };
+            return next;
+          });
+        }
+        // El progreso por lote no altera el resumen
+        if ((msg.changes || []).some(ch => ch.kind !== "progress")) setSummaryTick(t => t + 1);
+      };
+      ws.onclose = () => { if (!closed) retry = setTimeout(connect, 3000); };
+    };
+    connect();
 
-    return () => { clearInterval(id); try { pendingController.current?.abort(); } catch {} };
+    return () => {
+      closed = true;
+      clearTimeout(retry);
+      try { ws?.close(); } catch {}
+      try { pendingController.current?.abort(); } catch {}
+    };
   }, [autoRefresh, selectedProject]);
 
+  // Resumen del dashboard: se recarga solo cuando el feed avisa, como mucho una vez por segundo
+  // (throttle: una ráfaga continua de cambios no pospone indefinidamente la recarga)
+  const summaryProject = React.useRef(selectedProject);
+  const summaryTimer = React.useRef(null);
+  summaryProject.current = selectedProject;
+  const loadSummary = () => {
+    const qs = summaryProject.current ? `?project_id=${summaryProject.current}` : "";
+    fetch(`${API}/api/summary${qs}`).then(r=>r.json()).then(setSummary).catch(() => {});
+  };
   useEffect(() => {
-    const load = async () => {
-      const all = await fetch(`${API}/api/scans`).then(r=>r.json());
-      setScans(all);
-    };
-    load();
-    if (!autoRefresh) return;
-    const id = setInterval(load, 8000);
-    return () => clearInterval(id);
-  }, [autoRefresh]);
+    loadSummary();
+    return () => { clearTimeout(summaryTimer.current); summaryTimer.current = null; };
+  }, [selectedProject]);
+  useEffect(() => {
+    if (!summaryTick || summaryTimer.current) return;
+    summaryTimer.current = setTimeout(() => { summaryTimer.current = null; loadSummary(); }, 1000);
+  }, [summaryTick]);
 
   const filteredFindings = findings.filter(f => {
     const byTool = filterTool === "all" || f.tool === filterTool;
@@ -162,6 +207,19 @@ export default function App() {
     setTarget("");
   };
 
+  // Escaneo masivo: un objetivo por línea (o primera columna de un CSV)
+  const startBulkScan = async (file) => {
+    if (!selectedProject || !file) return alert("Selecciona proyecto y archivo de objetivos");
+    const form = new FormData();
+    form.append("project_id", selectedProject);
+    form.append("tools", tools.join(","));
+    form.append("file", file);
+    const res = await fetch(`${API}/api/scans/bulk/upload`, { method: "POST", body: form });
+    if (!res.ok) return alert(`No se pudo crear el escaneo masivo: ${await res.text()}`);
+    const s = await res.json();
+    setScans([s, ...scans]);
+  };
+
   const createSchedule = async () => {
     if (!selectedProject) return alert("Selecciona un proyecto para programar");
     if (!target) return alert("Define el objetivo del schedule");
@@ -207,6 +265,14 @@ export default function App() {
 
   const rerunScan = async (scanId) => {
     const s = await fetch(`${API}/api/scans/${scanId}`).then(r => r.json());
+    if (s.kind === "bulk") {
+      // Los masivos se relanzan sobre el mismo scan padre (la lista de objetivos vive en el servidor)
+      const res = await fetch(`${API}/api/scans/${scanId}/start`, { method: "POST" });
+      if (!res.ok) return alert(`No se pudo reiniciar: ${await res.text()}`);
+      const updated = await res.json();
+      setScans(scans.map(x => x.id === scanId ? updated : x));
+      return;
+    }
     const res = await fetch(`${API}/api/scans`, {
       method: "POST",
       headers: { "Content-Type": "application/json" },
@@ -216,14 +282,43 @@ export default function App() {
     setScans([newScan, ...scans]);
   };
 
+  // El PDF se genera en segundo plano: 202 mientras se renderiza, luego se abre el artefacto ya descargado
+  const downloadPdf = async (scanId) => {
+    const res = await fetch(`${API}/api/exports/${scanId}.pdf`);
+    if (res.status === 202) return alert("Generando reporte PDF, vuelve a intentarlo en unos segundos");
+    if (!res.ok) return alert(`No se pudo generar el PDF: ${res.status}`);
+    // Un enlace temporal sobre el blob: sin segunda descarga y sin bloqueo de popups tras el await
+    const href = URL.createObjectURL(await res.blob());
+    const a = document.createElement("a");
+    a.href = href;
+    a.download = `scan_${scanId}.pdf`;
+    document.body.appendChild(a);
+    a.click();
+    a.remove();
+    setTimeout(() => URL.revokeObjectURL(href), 60000);
+  };
+
   const openLogs = (scanId) => { setLogScanId(scanId); setLogs([]); };
   const closeLogs = () => { setLogScanId(null); setLogs([]); };
 
+  // Hallazgos paginados por cursor: la primera página al abrir, el resto con "Cargar más"
   const viewFindings = async (scanId) => {
-    const res = await fetch(`${API}/api/scans/${scanId}/findings`);
-    const f = await res.json();
-    setFindings(f);
-    renderGraph(f);
+    const res = await fetch(`${API}/api/scans/${scanId}/findings?limit=500`);
+    const page = await res.json();
+    setFindingsScanId(scanId);
+    setFindingsCursor(page.next_cursor);
+    setFindings(page.items);
+    renderGraph(page.items);
+  };
+
+  const loadMoreFindings = async () => {
+    if (!findingsScanId || findingsCursor == null) return;
+    const res = await fetch(`${API}/api/scans/${findingsScanId}/findings?limit=500&cursor=${findingsCursor}`);
+    const page = await res.json();
+    const all = [...findings, ...page.items];
+    setFindingsCursor(page.next_cursor);
+    setFindings(all);
+    renderGraph(all);
   };
 
   const renderGraph = (f) => {
@@ -248,7 +343,12 @@ export default function App() {
     if (!logScanId) return;
     const wsUrl = (API.startsWith("http") ? API.replace(/^http/, "ws") : `ws://${location.hostname}:8000`) + `/ws/scans/${logScanId}/logs`;
     const ws = new WebSocket(wsUrl);
-    ws.onmessage = (e) => setLogs(prev => [...prev, e.data]);
+    // Cada frame trae un lote de líneas: { id, lines }
+    ws.onmessage = (e) => {
+      const msg = JSON.parse(e.data);
+      const skipped = msg.dropped ? [`... ${msg.dropped} lotes omitidos ...`] : [];
+      setLogs(prev => [...prev, ...skipped, ...(msg.lines || [])]);
+    };
     ws.onerror = () => { try { ws.close(); } catch {} };
     return () => { try { ws.close(); } catch {} };
   }, [logScanId]);
@@ -280,9 +380,16 @@ export default function App() {
             <label><input type="checkbox" checked={tools.includes("theharvester")} onChange={e=>{
               const v = "theharvester"; setTools(e.target.checked ? [...tools,v] : tools.filter(t=>t!==v));
             }} /> TheHarvester</label>
-            {/* HIBP eliminado */}
+            {/* APIs HTTP (cola io): HIBP para emails, Spiderfoot para dominios/IPs */}
+            <label><input type="checkbox" checked={tools.includes("hibp")} onChange={e=>{
+              const v = "hibp"; setTools(e.target.checked ? [...tools,v] : tools.filter(t=>t!==v));
+            }} /> HIBP</label>
+            <label><input type="checkbox" checked={tools.includes("spiderfoot")} onChange={e=>{
+              const v = "spiderfoot"; setTools(e.target.checked ? [...tools,v] : tools.filter(t=>t!==v));
+            }} /> Spiderfoot</label>
           </div>
           <button onClick={startScan}>Iniciar escaneo</button>
+          <label style={{ marginLeft:8 }}>Masivo: <input type="file" accept=".txt,.csv" onChange={e=>{ startBulkScan(e.target.files[0]); e.target.value = ""; }} /></label>
           <div style={{ marginTop:8 }}>
             <input type="number" min="1" style={{ width:120 }} value={scheduleInterval} onChange={e=>setScheduleInterval(e.target.value)} />
             <button onClick={createSchedule} style={{ marginLeft:8 }}>Programar cada N minutos</button>
@@ -377,6 +484,14 @@ export default function App() {
         </tbody>
       </table>
 
+      {summary && (
+        <div style={{ display:"flex", gap:24, margin:"12px 0" }}>
+          <div><b>Scans:</b> {Object.entries(summary.scans).map(([k, n]) => `${k}: ${n}`).join(" · ") || "0"}</div>
+          <div><b>Hallazgos:</b> {summary.findings.total}</div>
+          <div><b>Severidad:</b> {Object.entries(summary.findings.severity).map(([k, n]) => `${k}: ${n}`).join(" · ") || "-"}</div>
+        </div>
+      )}
+
       <h3>Escaneos</h3>
       <table border="1" cellPadding="6">
         <thead><tr><th>ID</th><th>Proyecto</th><th>Objetivo</th><th>Estado</th><th>Herramientas</th><th>Acciones</th></tr></thead>
@@ -386,7 +501,7 @@ export default function App() {
               <td>{s.id}</td>
               <td>{s.project_id}</td>
               <td>{s.target}</td>
-              <td>{s.status}</td>
+              <td>{s.status}{s.kind === "bulk" && scanProgress[s.id]?.done != null ? ` (${scanProgress[s.id].done}/${s.target_count})` : ""}</td>
               <td>{(s.tools||[]).join(", ")}</td>
               <td>
                 <button onClick={() => viewFindings(s.id)}>Ver</button>{" "}
@@ -404,7 +519,8 @@ export default function App() {
                   setScans(scans.filter(x => x.id !== s.id));
                 }}>Eliminar</button>{" "}
                 <a href={`${API}/api/exports/${s.id}.csv`} target="_blank" rel="noreferrer">CSV</a>{" "}
-                <a href={`${API}/api/exports/${s.id}.pdf`} target="_blank" rel="noreferrer">PDF</a>
+                <a href={`${API}/api/exports/${s.id}.ndjson?gzip=1`} target="_blank" rel="noreferrer">NDJSON</a>{" "}
+                <button onClick={() => downloadPdf(s.id)}>PDF</button>
               </td>
             </tr>
           ))}
@@ -464,6 +580,9 @@ export default function App() {
             ))}
           </tbody>
         </table>
+        {findingsCursor != null && (
+          <button style={{ marginTop:10 }} onClick={loadMoreFindings}>Cargar más</button>
+        )}
       </div>
     </div>
   );